@@ -296,6 +296,30 @@ void Reversi::SetWeights(unsigned char* w) {
     }
 }
 
+void Reversi::SetBoard(ULL black, ULL white, int player)
+{
+    board_[0] = black;
+    board_[1] = white;
+    player_ = player;
+    skip_ = 0;
+    step_ = CountBit(black | white) - 4;
+    key_ = 0;
+    piece_eval_ = 0;
+    const array<int, BOARD_SIZE> &weight = IsEarly(step_) ? early_weight : late_weight;
+    for (int i = 0; i < BOARD_SIZE; i++)
+    {
+        for (int j = 0; j < 2; j++)
+        {
+            if (board_[j] >> i & 1u)
+            {
+                key_ ^= hash_key[i][j];
+                // 与Flip中的增量保持相同的尺度
+                piece_eval_ += (j == player_ ? 2 : -2) * weight[i];
+            }
+        }
+    }
+}
+
 int AI::Search(const Reversi &game) const
 {
     if (IsLate(game.GetStep()))
@@ -303,6 +327,11 @@ int AI::Search(const Reversi &game) const
     return AlphaBeta(game, MAX_DEPTH, -INF, INF).first;
 }
 
+int AI::Search(const Reversi &game, int limit) const
+{
+    return AlphaBeta(game, limit, -INF, INF).first;
+}
+
 PII AI::AlphaBeta(const Reversi &game, int limit, int alpha, int beta) const
 {
     if (game.IsOver() || limit == 0)
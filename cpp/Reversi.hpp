@@ -116,6 +116,8 @@ public:
 
     // 设置权重
     void SetWeights(unsigned char* w);
+    // 直接设置棋盘，player==0轮到黑方
+    void SetBoard(ULL black, ULL white, int player);
 private:
     array<ULL, 2> board_;
     // player_==0 轮到黑方
@@ -141,6 +143,8 @@ public:
     AI() {}
     ~AI() {}
     int Search(const Reversi &game) const;
+    // 指定搜索深度
+    int Search(const Reversi &game, int limit) const;
 
 private:
     PII AlphaBeta(const Reversi &game, int limit, int alpha, int beta) const;
@@ -0,0 +1,59 @@
+// 供Python通过ctypes调用的C接口，编译为共享库libreversi_core.so
+#include "Reversi.hpp"
+
+extern "C"
+{
+    // 所有可以落子的位置
+    ULL rv_get_available(ULL my, ULL opp)
+    {
+        ULL pos = 0ull, tmp = 0ull, emp = ~(my | opp);
+        for (int i = 0; i < all_dir.size(); i++)
+        {
+            tmp = all_dir[i](my) & opp;
+            for (int j = 0; j < 5; j++)
+                tmp |= all_dir[i](tmp) & opp;
+            pos |= all_dir[i](tmp) & emp;
+        }
+        return pos;
+    }
+
+    // 在idx位置落子之后被翻转的棋子
+    ULL rv_get_flips(ULL my, ULL opp, int idx)
+    {
+        ULL flips = 0ull, pos = 1ull << idx;
+        for (int i = 0; i < all_dir.size(); i++)
+        {
+            ULL tmp = all_dir[i](pos), mask = 0ull;
+            while (tmp & opp)
+            {
+                mask |= tmp;
+                tmp = all_dir[i](tmp);
+            }
+            if (tmp & my)
+                flips |= mask;
+        }
+        return flips;
+    }
+
+    int rv_count(ULL x) { return CountBit(x); }
+
+    // 清空哈希表
+    void rv_clear_hash()
+    {
+        Reversi game;
+        game.Initialize();
+    }
+
+    // 搜索最佳落子位置，player==0轮到黑方，limit<=0时使用AI::Search默认的深度
+    int rv_search(ULL black, ULL white, int player, int limit)
+    {
+        Reversi game;
+        AI bot;
+        game.SetBoard(black, white, player);
+        if (!game.GetAvailable())
+            return -1;
+        if (limit <= 0)
+            return bot.Search(game);
+        return bot.Search(game, limit);
+    }
+}
@@ -0,0 +1,412 @@
+"""
+无界面的对战平台：在多个进程中让两个棋手下很多盘棋，统计胜平负、Elo(含置信区间)和每秒盘数，可以用SPRT提前结束。
+
+棋手用字符串描述：
+    random[:seed]                 随机落子
+    search[:depth]                SearchEngine，默认权重
+    aiv2:<weights.json>[:depth]   ai_trainer保存的染色体作为SearchEngine的权重(两者的估价函数结构相同)
+    dqn:<checkpoint_dir>          DQN模型，取合法位置中Q值最大的
+    mcts:<checkpoint_dir>[:sims]  用DQN模型评估叶子的MCTSPlayer
+新的棋手类型用register注册，棋手需要提供think(env, my_color) -> pos(无处落子时为-1)。
+
+每个开局(固定的开局序列)下两盘，双方交换颜色。开局由随机种子生成，或者从文件读取(每行一个开局，空格分隔的落子位置)。
+用法：
+    python arena.py search:3 random --games 200 --workers 4
+    python arena.py --check     # 检查Elo和SPRT的计算
+    python arena.py aiv2:../training/save/10.json:3 search:3 --sprt 0 30 --games 2000
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from reversi import ReversiEnv
+from position import Position, iter_bits, BLACK, WHITE, DRAW, PASS
+from search import SearchEngine
+
+# --------------------------------------global-----------------------------------------
+Z_95 = 1.959964  # 95%置信区间
+PLAYERS = {}  # 棋手类型 -> 工厂函数，工厂函数的参数为描述字符串中冒号之后的各段
+
+
+def register(kind):
+    """
+    注册棋手类型的装饰器
+    """
+    def decorator(factory):
+        PLAYERS[kind] = factory
+        return factory
+    return decorator
+
+
+def make_player(spec):
+    """
+    :param spec: 棋手的描述字符串，例如search:3
+    """
+    kind, *args = spec.split(':')
+    if kind not in PLAYERS:
+        raise ValueError("unknown player {}, available: {}".format(kind, ', '.join(sorted(PLAYERS))))
+    return PLAYERS[kind](*args)
+
+
+# --------------------------------------players-----------------------------------------
+class RandomPlayer:
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def new_game(self, index):
+        """
+        每盘棋开始时重新设置种子，结果与这盘棋在哪个进程中下无关
+        """
+        self.rng.seed('{}:{}'.format(self.seed, index))
+
+    def think(self, env, my_color):
+        valid_pos = env.get_valid_pos(my_color)
+        return self.rng.choice(valid_pos) if valid_pos else PASS
+
+
+class DQNPlayer:
+    def __init__(self, checkpoint_dir):
+        """
+        在单独的计算图中恢复checkpoint_dir中最新的模型，多个DQN棋手可以在同一个进程中
+        """
+        import tensorflow as tf
+        from dqn import DQN
+
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            self.agent = DQN(ReversiEnv())
+            saver = tf.train.Saver()
+            self.agent.sess = tf.Session(graph=self.graph)
+            checkpoint = tf.train.latest_checkpoint(checkpoint_dir)
+            if not checkpoint:
+                raise ValueError("no checkpoint in {}".format(checkpoint_dir))
+            saver.restore(self.agent.sess, checkpoint)
+
+    def q_values(self, boards, colors):
+        with self.graph.as_default():
+            return self.agent.q_values(boards, colors)
+
+    def think(self, env, my_color):
+        valid_pos = env.get_valid_pos(my_color)
+        if not valid_pos:
+            return PASS
+        q = self.q_values(env.observe(my_color)[None], [my_color])[0]
+        return max(valid_pos, key=lambda pos: q[pos])
+
+
+@register('random')
+def _random_player(seed=0):
+    return RandomPlayer(int(seed))
+
+
+@register('search')
+def _search_player(depth=4):
+    return SearchEngine(depth=int(depth))
+
+
+@register('aiv2')
+def _aiv2_player(path, depth=4):
+    with open(path) as f:
+        chromosome = json.load(f)
+    return SearchEngine([x / 255 for x in chromosome], int(depth))
+
+
+@register('dqn')
+def _dqn_player(checkpoint_dir='save/'):
+    return DQNPlayer(checkpoint_dir)
+
+
+@register('mcts')
+def _mcts_player(checkpoint_dir='save/', simulations=400):
+    from mcts import MCTSPlayer
+    return MCTSPlayer(DQNPlayer(checkpoint_dir).q_values, int(simulations))
+
+
+# --------------------------------------openings-----------------------------------------
+def opening_suite(plies=4, count=50, seed=0):
+    """
+    随机下plies步得到count个不同的开局局面
+    :return openings: [[pos, ...], ...]
+    """
+    rng = random.Random(seed)
+    openings = []
+    seen = set()
+    for _ in range(count * 100):
+        if len(openings) == count:
+            break
+        position = Position()
+        moves = []
+        for _ in range(plies):
+            legal = list(iter_bits(position.legal_bits()))
+            move = rng.choice(legal) if legal else PASS
+            moves.append(move)
+            position = position.play(move)
+        if position.key() not in seen:
+            seen.add(position.key())
+            openings.append(moves)
+    return openings
+
+
+def load_openings(path):
+    with open(path) as f:
+        return [list(map(int, line.split())) for line in f if line.strip()]
+
+
+# --------------------------------------statistics-----------------------------------------
+def _score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def _score_stats(wins, draws, losses):
+    """
+    结果只有一种(全胜、全负、全平)时方差为0，给双方各补半盘胜局，使LLR有正确的符号、置信区间有限
+    :return n, score, variance: 盘数和每盘棋的平均得分(胜1、平0.5、负0)及方差
+    """
+    n = wins + draws + losses
+    if wins == n or draws == n or losses == n:
+        wins, losses = wins + 0.5, losses + 0.5
+        n += 1
+    score = (wins + 0.5 * draws) / n
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    return n, score, variance
+
+
+def elo(wins, draws, losses):
+    """
+    :return elo, low, high: 第一个棋手相对第二个棋手的Elo差和95%置信区间
+    """
+    if wins + draws + losses == 0:
+        return 0.0, -math.inf, math.inf
+    n, score, variance = _score_stats(wins, draws, losses)
+    margin = Z_95 * math.sqrt(variance / n)
+    return _score_to_elo(score), _score_to_elo(score - margin), _score_to_elo(score + margin)
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """
+    H0: Elo差为elo0，H1: Elo差为elo1 的对数似然比(三项分布的正态近似)
+    """
+    if wins + draws + losses == 0:
+        return 0.0
+    n, score, variance = _score_stats(wins, draws, losses)
+    s0 = 1 / (1 + 10 ** (-elo0 / 400))
+    s1 = 1 / (1 + 10 ** (-elo1 / 400))
+    return n * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+
+def sprt_bounds(alpha=0.05, beta=0.05):
+    """
+    :return lower, upper: LLR低于lower时接受H0，高于upper时接受H1
+    """
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def check_statistics():
+    """
+    检查只有一种结果(全胜、全负、全平)时的Elo和LLR：LLR的符号正确并且越过SPRT的边界，置信区间有限、有宽度
+    不一致时抛出AssertionError
+    """
+    lower, upper = sprt_bounds()
+    for games in (10, 200):
+        assert sprt_llr(games, 0, 0, 0, 30) > upper, games
+        assert sprt_llr(0, 0, games, 0, 30) < lower, games
+        assert sprt_llr(0, games, 0, 0, 30) < 0, games  # 全平更接近elo0
+        for wins, draws, losses in ((games, 0, 0), (0, 0, games), (0, games, 0)):
+            rating, low, high = elo(wins, draws, losses)
+            assert all(math.isfinite(x) for x in (rating, low, high)), (wins, draws, losses)
+            assert low < rating < high, (wins, draws, losses)
+        assert elo(games, 0, 0)[0] > 0 > elo(0, 0, games)[0]
+    assert sprt_llr(199, 0, 1, 0, 30) < sprt_llr(200, 0, 0, 0, 30)  # 全胜的证据比199胜1负更强
+    assert sprt_llr(0, 0, 0, 0, 30) == 0.0
+
+
+# --------------------------------------worker-----------------------------------------
+_players = None  # 每个进程中的两个棋手
+
+
+def _init_worker(spec1, spec2):
+    global _players
+    _players = (make_player(spec1), make_player(spec2))
+
+
+def play_game(black, white, opening=(), index=0):
+    """
+    :param opening: 开局的落子位置，先在棋盘上下完这些步
+    :return winner, plies: ReversiEnv.winner()的结果和总步数
+    """
+    env = ReversiEnv()
+    for player in (black, white):
+        if hasattr(player, 'new_game'):
+            player.new_game(index)
+    players = {BLACK: black, WHITE: white}
+    color = BLACK
+    winner = env.GAMING
+    plies = 0
+    for pos in opening:
+        _, _, winner = env.step((pos, color, color))
+        color = -color
+        plies += 1
+    while winner == env.GAMING:
+        valid_pos = env.get_valid_pos(color)
+        pos = players[color].think(env, color) if valid_pos else PASS
+        if valid_pos and pos not in valid_pos:
+            raise ValueError("{} played an illegal move {}".format(type(players[color]).__name__, pos))
+        _, _, winner = env.step((int(pos), color, color))
+        color = -color
+        plies += 1
+    return winner, plies
+
+
+def _play(index, opening, first_black):
+    """
+    :return index, score: 第一个棋手的得分，胜1、平0.5、负0
+    """
+    player1, player2 = _players
+    black, white = (player1, player2) if first_black else (player2, player1)
+    winner, _ = play_game(black, white, opening, index)
+    if winner == DRAW:
+        return index, 0.5
+    return index, 1.0 if (winner == BLACK) == first_black else 0.0
+
+
+class Arena:
+    def __init__(self, spec1, spec2, openings=None, workers=1, sprt=None):
+        """
+        :param spec1: 第一个棋手的描述字符串，统计结果都以它的视角
+        :param spec2: 第二个棋手
+        :param openings: 开局列表，None表示opening_suite()
+        :param workers: 进程数，1表示在本进程中下棋，None表示CPU核数
+        :param sprt: (elo0, elo1, alpha, beta)，None表示不提前结束
+        """
+        self.spec1 = spec1
+        self.spec2 = spec2
+        self.openings = openings if openings is not None else opening_suite()
+        self.workers = workers or os.cpu_count()
+        self.sprt = sprt
+        self.stats = None
+
+    # --------------------------------------public-----------------------------------------
+    def run(self, games, verbose=False):
+        """
+        第i盘棋使用第i // 2个开局(循环使用)，i为偶数时第一个棋手执黑
+        :param games: 最多下的盘数
+        :return stats: 胜平负、Elo及置信区间、LLR、每秒盘数等
+        """
+        tasks = [(i, self.openings[i // 2 % len(self.openings)], i % 2 == 0) for i in range(games)]
+        results = {'wins': 0, 'draws': 0, 'losses': 0}
+        decision = None
+        start = time.perf_counter()
+
+        def record(score):
+            nonlocal decision
+            results['wins' if score == 1 else 'draws' if score == 0.5 else 'losses'] += 1
+            if self.sprt is not None:
+                elo0, elo1, alpha, beta = self.sprt
+                llr = sprt_llr(results['wins'], results['draws'], results['losses'], elo0, elo1)
+                lower, upper = sprt_bounds(alpha, beta)
+                if llr <= lower:
+                    decision = 'H0'
+                elif llr >= upper:
+                    decision = 'H1'
+            if verbose and sum(results.values()) % 100 == 0:
+                print(self.__format(results, time.perf_counter() - start), file=sys.stderr)
+            return decision is not None
+
+        if self.workers == 1:
+            _init_worker(self.spec1, self.spec2)
+            for task in tasks:
+                if record(_play(*task)[1]):
+                    break
+        else:
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                     initargs=(self.spec1, self.spec2)) as pool:
+                futures = [pool.submit(_play, *task) for task in tasks]
+                for future in as_completed(futures):
+                    if record(future.result()[1]):
+                        # 显著之后取消还没有开始的棋局
+                        for f in futures:
+                            f.cancel()
+                        break
+
+        seconds = time.perf_counter() - start
+        self.stats = self.__summary(results, seconds, decision)
+        if verbose:
+            print(self.__format(results, seconds))
+        return self.stats
+
+    # --------------------------------------private-----------------------------------------
+    def __summary(self, results, seconds, decision):
+        wins, draws, losses = results['wins'], results['draws'], results['losses']
+        games = wins + draws + losses
+        rating, low, high = elo(wins, draws, losses)
+        stats = {
+            'games': games,
+            'wins': wins,
+            'draws': draws,
+            'losses': losses,
+            'score': (wins + 0.5 * draws) / games if games else 0.0,
+            'elo': rating,
+            'elo_low': low,
+            'elo_high': high,
+            'seconds': seconds,
+            'games_per_second': games / seconds if seconds > 0 else 0.0,
+        }
+        if self.sprt is not None:
+            stats['llr'] = sprt_llr(wins, draws, losses, self.sprt[0], self.sprt[1])
+            stats['sprt'] = decision
+        return stats
+
+    def __format(self, results, seconds):
+        stats = self.__summary(results, seconds, None)
+        text = "{} vs {}: {} games  +{} ={} -{}  score {:.1%}  elo {:+.1f} [{:+.1f}, {:+.1f}]  {:.2f} games/s".format(
+            self.spec1, self.spec2, stats['games'], stats['wins'], stats['draws'], stats['losses'], stats['score'],
+            stats['elo'], stats['elo_low'], stats['elo_high'], stats['games_per_second'])
+        if self.sprt is not None:
+            lower, upper = sprt_bounds(self.sprt[2], self.sprt[3])
+            text += "  llr {:.2f} ({:.2f}, {:.2f})".format(stats['llr'], lower, upper)
+            if self.stats is not None and self.stats.get('sprt'):
+                text += "  accept {}".format(self.stats['sprt'])
+        return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="play many headless games between two players")
+    parser.add_argument('player1', nargs='?')
+    parser.add_argument('player2', nargs='?')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=1, help="进程数，0表示CPU核数")
+    parser.add_argument('--openings', help="开局文件，每行一个开局(空格分隔的落子位置)")
+    parser.add_argument('--opening-plies', type=int, default=4)
+    parser.add_argument('--opening-count', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sprt', type=float, nargs=2, metavar=('ELO0', 'ELO1'), help="SPRT的两个假设，显著时提前结束")
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--check', action='store_true', help="只检查Elo和SPRT的计算，不下棋")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        check_statistics()
+        print("statistics ok")
+        return 0
+    if args.player2 is None:
+        parser.error("player1 and player2 are required")
+
+    if args.openings:
+        openings = load_openings(args.openings)
+    else:
+        openings = opening_suite(args.opening_plies, args.opening_count, args.seed)
+    sprt = (args.sprt[0], args.sprt[1], args.alpha, args.beta) if args.sprt else None
+    arena = Arena(args.player1, args.player2, openings, args.workers or None, sprt)
+    arena.run(args.games, verbose=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
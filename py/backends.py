@@ -0,0 +1,176 @@
+"""
+ReversiEnv的计算后端：走法生成、翻转、计数和搜索。
+PythonBackend为纯python实现；CppBackend通过ctypes调用cpp/中编译出的libreversi_core.so。
+
+编译共享库：
+    mkdir cpp/build && cd cpp/build && cmake .. -DCMAKE_BUILD_TYPE=Release && make reversi_core
+检查所有可用的后端：
+    python backends.py
+"""
+import ctypes
+import os
+import random
+import sys
+import bitboard
+from position import Position, popcount, iter_bits, BLACK, PASS
+from search import SearchEngine
+
+# --------------------------------------global-----------------------------------------
+LIBRARY_ENV = 'REVERSI_CORE_LIB'  # 可以用环境变量指定共享库的路径
+LIBRARY_NAME = 'libreversi_core.so'
+LIBRARY_DIRS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cpp', 'build'),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cpp', 'cmake-build-release'),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cpp', 'cmake-build-debug'),
+]
+DEFAULT_DEPTH = 4
+
+
+class PythonBackend:
+    name = 'python'
+
+    def get_valid_bits(self, my, opp):
+        return bitboard.get_valid_bits(my, opp)
+
+    def get_flip_bits(self, my, opp, sq):
+        return bitboard.get_flip_bits(my, opp, sq)
+
+    def count_bits(self, x):
+        return popcount(x)
+
+    def search(self, black, white, player, depth=DEFAULT_DEPTH):
+        """
+        :param player: 执棋方，BLACK或WHITE
+        :param depth: 搜索深度
+        :return pos: 最佳落子位置，无处落子时为-1
+        """
+        return SearchEngine(depth=depth).search(black, white, player)[1]
+
+
+class CppBackend:
+    name = 'cpp'
+
+    def __init__(self, path):
+        """
+        :param path: libreversi_core.so的路径
+        """
+        self.path = path
+        self.lib = ctypes.CDLL(path)
+        u64 = ctypes.c_uint64
+        self.lib.rv_get_available.argtypes = [u64, u64]
+        self.lib.rv_get_available.restype = u64
+        self.lib.rv_get_flips.argtypes = [u64, u64, ctypes.c_int]
+        self.lib.rv_get_flips.restype = u64
+        self.lib.rv_count.argtypes = [u64]
+        self.lib.rv_count.restype = ctypes.c_int
+        self.lib.rv_search.argtypes = [u64, u64, ctypes.c_int, ctypes.c_int]
+        self.lib.rv_search.restype = ctypes.c_int
+        self.lib.rv_clear_hash.argtypes = []
+        self.lib.rv_clear_hash.restype = None
+
+    def get_valid_bits(self, my, opp):
+        return self.lib.rv_get_available(my, opp)
+
+    def get_flip_bits(self, my, opp, sq):
+        return self.lib.rv_get_flips(my, opp, sq)
+
+    def count_bits(self, x):
+        return self.lib.rv_count(x)
+
+    def search(self, black, white, player, depth=DEFAULT_DEPTH):
+        """
+        使用C++的AI::AlphaBeta(带哈希表)搜索
+        """
+        return self.lib.rv_search(black, white, 0 if player == BLACK else 1, depth)
+
+    def clear_hash(self):
+        self.lib.rv_clear_hash()
+
+
+def find_library():
+    """
+    :return path: 共享库的路径，找不到时为None
+    """
+    path = os.environ.get(LIBRARY_ENV)
+    if path and os.path.exists(path):
+        return path
+    for directory in LIBRARY_DIRS:
+        path = os.path.join(directory, LIBRARY_NAME)
+        if os.path.exists(path):
+            return os.path.normpath(path)
+    return None
+
+
+def load_backend(name='auto'):
+    """
+    :param name: 'python'、'cpp'或者'auto'。'auto'优先使用C++后端，找不到共享库时使用纯python后端
+    """
+    if name == 'python':
+        return PythonBackend()
+    path = find_library()
+    if path is not None:
+        try:
+            return CppBackend(path)
+        except OSError:
+            if name == 'cpp':
+                raise
+    elif name == 'cpp':
+        raise OSError("{} not found, set {} or build cpp/".format(LIBRARY_NAME, LIBRARY_ENV))
+    return PythonBackend()
+
+
+def check_backend(backend, games=20, perft_depth=6, seed=0):
+    """
+    后端的测试：perft结点数，随机对局中每一步的走法与翻转都与bitboard相同，搜索返回合法的位置
+    :return ok: bool
+    """
+    from reversi import ReversiEnv
+    from perft import perft, KNOWN_NODES
+
+    for depth in range(1, perft_depth + 1):
+        if perft(depth, ReversiEnv(backend)) != KNOWN_NODES[depth]:
+            print("{}: perft({}) wrong".format(backend.name, depth))
+            return False
+
+    rng = random.Random(seed)
+    for _ in range(games):
+        position = Position()
+        while not position.is_over():
+            my, opp = position.my_board(), position.opp_board()
+            moves = backend.get_valid_bits(my, opp)
+            if moves != bitboard.get_valid_bits(my, opp):
+                print("{}: get_valid_bits wrong at {}".format(backend.name, position))
+                return False
+            for pos in iter_bits(moves):
+                if backend.get_flip_bits(my, opp, pos) != bitboard.get_flip_bits(my, opp, pos):
+                    print("{}: get_flip_bits wrong at {} {}".format(backend.name, position, pos))
+                    return False
+            if backend.count_bits(my) != popcount(my):
+                print("{}: count_bits wrong at {}".format(backend.name, position))
+                return False
+            if moves and rng.random() < 0.1:
+                pos = backend.search(position.black, position.white, position.player, 2)
+                if not moves >> pos & 1:
+                    print("{}: search returned illegal move {} at {}".format(backend.name, pos, position))
+                    return False
+            position = position.play(rng.choice(list(iter_bits(moves))) if moves else PASS)
+    return True
+
+
+def main():
+    ok = True
+    backends = [PythonBackend()]
+    path = find_library()
+    if path is None:
+        print("cpp: {} not found, skipped".format(LIBRARY_NAME))
+    else:
+        backends.append(CppBackend(path))
+    for backend in backends:
+        result = check_backend(backend)
+        print("{}: {}".format(backend.name, 'ok' if result else 'FAILED'))
+        ok = ok and result
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+import numpy as np
+
+# --------------------------------------global-----------------------------------------
+# 所有常量都用np.uint64表示，避免与python int运算时被提升为float64或object
+ZERO = np.uint64(0)
+ONE = np.uint64(1)
+MASK_W = np.uint64(0xfefefefefefefefe)
+MASK_E = np.uint64(0x7f7f7f7f7f7f7f7f)
+SHIFT_1 = np.uint64(1)
+SHIFT_8 = np.uint64(8)
+
+
+# 与bitboard.to_*完全相同的移位方式，uint64左移溢出的部分自动被丢弃，所以不需要再与MASK
+def to_n(x):
+    return x >> SHIFT_8
+
+
+def to_s(x):
+    return x << SHIFT_8
+
+
+def to_w(x):
+    return (x & MASK_W) >> SHIFT_1
+
+
+def to_e(x):
+    return (x & MASK_E) << SHIFT_1
+
+
+def to_nw(x):
+    return to_n(to_w(x))
+
+
+def to_ne(x):
+    return to_n(to_e(x))
+
+
+def to_sw(x):
+    return to_s(to_w(x))
+
+
+def to_se(x):
+    return to_s(to_e(x))
+
+
+DIRECTIONS = (to_n, to_s, to_w, to_e, to_nw, to_ne, to_sw, to_se)
+
+
+def get_valid_bits(my, opp):
+    """
+    同时计算多盘棋的可落子位置，算法与ReversiEnv.get_valid_pos相同
+    :param my: np.uint64数组，执棋方的棋盘
+    :param opp: np.uint64数组，对手的棋盘
+    :return pos: np.uint64数组，每一位表示能否落子
+    """
+    emp = ~(my | opp)
+    pos = np.zeros_like(my)
+    for direction in DIRECTIONS:
+        tmp = direction(my) & opp
+        for j in range(5):
+            tmp |= direction(tmp) & opp
+        pos |= direction(tmp) & emp
+    return pos
+
+
+def get_flip_bits(my, opp, move):
+    """
+    同时计算多盘棋落子后被翻转的棋子
+    :param my: np.uint64数组，执棋方的棋盘
+    :param opp: np.uint64数组，对手的棋盘
+    :param move: np.uint64数组，落子位置，0表示不落子
+    :return flips: np.uint64数组，被翻转的棋子
+    """
+    flips = np.zeros_like(my)
+    for direction in DIRECTIONS:
+        tmp = direction(move) & opp
+        for j in range(5):
+            tmp |= direction(tmp) & opp
+        # 连续的对手棋子后面紧跟着自己的棋子才能翻转
+        flips |= np.where(direction(tmp) & my != ZERO, tmp, ZERO)
+    return flips
+
+
+def count_bits(x):
+    """
+    分治的并行计数方法(原来ReversiEnv中的__count_bits)，结果与position.popcount相同
+    """
+    x = (x & np.uint64(0x5555555555555555)) + ((x & np.uint64(0xaaaaaaaaaaaaaaaa)) >> np.uint64(1))
+    x = (x & np.uint64(0x3333333333333333)) + ((x & np.uint64(0xcccccccccccccccc)) >> np.uint64(2))
+    x = (x & np.uint64(0x0f0f0f0f0f0f0f0f)) + ((x & np.uint64(0xf0f0f0f0f0f0f0f0)) >> np.uint64(4))
+    x = (x & np.uint64(0x00ff00ff00ff00ff)) + ((x & np.uint64(0xff00ff00ff00ff00)) >> np.uint64(8))
+    x = (x & np.uint64(0x0000ffff0000ffff)) + ((x & np.uint64(0xffff0000ffff0000)) >> np.uint64(16))
+    x = (x & np.uint64(0x00000000ffffffff)) + ((x & np.uint64(0xffffffff00000000)) >> np.uint64(32))
+    return x.astype(np.int64)
+
+
+def bits_to_mask(x):
+    """
+    np.uint64数组转换为(N, 64)的bool数组，第i列对应棋盘第i个位置
+    """
+    x = np.ascontiguousarray(x, dtype='<u8')
+    return np.unpackbits(x.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little').astype(bool)
+
+
+def square_bits(actions):
+    """
+    落子位置转换为np.uint64数组，-1表示不落子，对应0
+    """
+    actions = np.asarray(actions, dtype=np.int64)
+    shift = np.maximum(actions, 0).astype(np.uint64)
+    return np.where(actions >= 0, ONE << shift, ZERO)
+
+
+class BatchReversiEnv:
+    """
+    同时进行num_envs盘棋的黑白棋环境，每盘棋的棋盘用np.uint64数组的一个元素表示。
+    与ReversiEnv不同，每盘棋的执棋方由环境自己记录，黑方先下，每次step之后交换执棋方。
+    """
+    # --------------------------------------global-----------------------------------------
+    # 与ReversiEnv一致。这里不直接引用ReversiEnv，避免reversi与codec、batch_reversi循环导入
+    BLACK = -1
+    WHITE = 1
+    DRAW = 65535
+    GAMING = 65534
+    BOARD_WIDTH = 8
+    BOARD_SIZE = 64
+
+    INIT_BLACK = np.uint64((1 << (3 * 8 + 4)) | (1 << (4 * 8 + 3)))
+    INIT_WHITE = np.uint64((1 << (3 * 8 + 3)) | (1 << (4 * 8 + 4)))
+
+    def __init__(self, num_envs, auto_reset=True):
+        """
+        :param num_envs: 同时进行的棋局数
+        :param auto_reset: 棋局结束后是否自动开始新的一局
+        """
+        self.num_envs = num_envs
+        self.auto_reset = auto_reset
+
+        self.black_board = np.zeros(num_envs, dtype=np.uint64)
+        self.white_board = np.zeros(num_envs, dtype=np.uint64)
+        self.player = np.zeros(num_envs, dtype=np.int32)  # 每盘棋当前的执棋方
+        self.skip_count = np.zeros(num_envs, dtype=np.int32)
+        self.terminal_board = None  # 自动重置之前，最后一步之后的棋盘
+
+        self.reset()
+
+    # --------------------------------------public-----------------------------------------
+    def reset(self, index=None):
+        """
+        重置棋局
+        :param index: 需要重置的棋局下标，None表示全部重置
+        :return board: (num_envs, 64)的棋盘
+        """
+        if index is None:
+            index = slice(None)
+        self.black_board[index] = self.INIT_BLACK
+        self.white_board[index] = self.INIT_WHITE
+        self.player[index] = self.BLACK
+        self.skip_count[index] = 0
+        return self.__get_board()
+
+    def valid_bits(self):
+        """
+        每盘棋执棋方能落子的位置，np.uint64数组
+        """
+        my, opp = self.__split()
+        return get_valid_bits(my, opp)
+
+    def valid_mask(self):
+        """
+        每盘棋执棋方能落子的位置，(num_envs, 64)的bool数组
+        """
+        return bits_to_mask(self.valid_bits())
+
+    def random_actions(self, rng=None):
+        """
+        为每盘棋随机选择一个合法的落子位置，无处落子时为-1
+        :param rng: np.random.Generator，None时使用默认的生成器
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        mask = self.valid_mask()
+        score = rng.random(mask.shape) * mask
+        return np.where(mask.any(axis=1), np.argmax(score, axis=1), -1)
+
+    def step(self, actions):
+        """
+        所有棋局的执棋方同时落子
+        :param actions: 长度为num_envs的落子位置，-1表示跳过
+        :return:下一个状态，执棋方得到的奖励，胜利方(GAMING表示未结束)
+        """
+        win_reward = 100
+        lose_reward = -100
+
+        actions = np.asarray(actions)
+        move = square_bits(actions)
+        is_black = self.player == self.BLACK
+
+        my, opp = self.__split()
+        flips = get_flip_bits(my, opp, move)
+        my = (my | move) ^ flips
+        opp = opp ^ flips
+        self.black_board = np.where(is_black, my, opp)
+        self.white_board = np.where(is_black, opp, my)
+
+        self.skip_count = np.where(actions < 0, self.skip_count + 1, 0).astype(np.int32)
+        mover = self.player
+        self.player = -self.player
+
+        winner = self.winner()
+        reward = np.where(winner == mover, win_reward, 0)
+        reward = np.where((winner != mover) & (winner != self.DRAW) & (winner != self.GAMING), lose_reward, reward)
+
+        board = self.__get_board()
+        done = winner != self.GAMING
+        if self.auto_reset and done.any():
+            self.terminal_board = board.copy()
+            board = self.reset(np.flatnonzero(done))
+        return board, reward, winner
+
+    def is_over(self):
+        """
+        与ReversiEnv.is_over相同：连续两次跳过或者棋盘没有空位
+        """
+        emp = ~(self.black_board | self.white_board)
+        return (self.skip_count >= 2) | (emp == ZERO)
+
+    def winner(self):
+        black_piece = count_bits(self.black_board)
+        white_piece = count_bits(self.white_board)
+        result = np.where(black_piece > white_piece, self.BLACK,
+                          np.where(black_piece == white_piece, self.DRAW, self.WHITE))
+        return np.where(self.is_over(), result, self.GAMING)
+
+    # --------------------------------------private-----------------------------------------
+    def __split(self):
+        """
+        按照执棋方把棋盘分成自己的和对手的
+        """
+        is_black = self.player == self.BLACK
+        my = np.where(is_black, self.black_board, self.white_board)
+        opp = np.where(is_black, self.white_board, self.black_board)
+        return my, opp
+
+    def __get_board(self):
+        return bits_to_mask(self.black_board) * float(self.BLACK) + bits_to_mask(self.white_board) * float(self.WHITE)
@@ -0,0 +1,195 @@
+"""
+查表法实现的走法生成和翻转。
+棋盘编号与ReversiEnv相同：左上角为0，右下角为63，第i位表示第i // 8行第i % 8列。
+"""
+
+# --------------------------------------global-----------------------------------------
+MASK = 0xffff_ffff_ffff_ffff
+FILE_A = 0x0101010101010101  # 第0列
+INNER = 0x7e7e7e7e7e7e7e7e  # 去掉第0列和第7列
+DIAG_MAGIC = 0x0101010101010101  # 把对角线上的棋子投影到最高的8位，第j位对应第j列
+COL_MAGIC = 0x0102040810204080  # 把第0列上的棋子投影到最高的8位，第j位对应第j行
+
+N, S, W, E, NW, NE, SW, SE = range(8)
+
+
+# 八个方向的移位，项目中的移位都以这里为准(原来ReversiEnv中的__to_*)
+def to_n(x):
+    return (x >> 8) & MASK
+
+
+def to_s(x):
+    return (x << 8) & MASK
+
+
+def to_w(x):
+    return ((x & 0xfefefefefefefefe) >> 1) & MASK
+
+
+def to_e(x):
+    return ((x & 0x7f7f7f7f7f7f7f7f) << 1) & MASK
+
+
+def to_nw(x):
+    return to_n(to_w(x))
+
+
+def to_ne(x):
+    return to_n(to_e(x))
+
+
+def to_sw(x):
+    return to_s(to_w(x))
+
+
+def to_se(x):
+    return to_s(to_e(x))
+
+
+DIRECTIONS = (to_n, to_s, to_w, to_e, to_nw, to_ne, to_sw, to_se)
+
+
+def _build_rays():
+    """
+    RAYS[d][sq]：从sq出发沿方向d能到达的所有位置(不包括sq)
+    """
+    rays = []
+    for direction in DIRECTIONS:
+        row = []
+        for sq in range(64):
+            ray = 0
+            x = direction(1 << sq)
+            while x:
+                ray |= x
+                x = direction(x)
+            row.append(ray)
+        rays.append(row)
+    return rays
+
+
+def _build_outflank():
+    """
+    OUTFLANK[x][opp]：一条线上在第x格落子，对手棋子为opp(8位)时，
+    紧跟在连续的对手棋子之后、可能夹住对手的位置
+    """
+    table = []
+    for x in range(8):
+        row = []
+        for opp in range(256):
+            out = 0
+            i = x + 1
+            while i < 8 and opp >> i & 1:
+                i += 1
+            if x + 1 < i < 8:
+                out |= 1 << i
+            i = x - 1
+            while i >= 0 and opp >> i & 1:
+                i -= 1
+            if 0 <= i < x - 1:
+                out |= 1 << i
+            row.append(out)
+        table.append(row)
+    return table
+
+
+def _build_flipped():
+    """
+    FLIPPED[x][out]：在第x格落子，out为夹住对手的位置时，一条线上被翻转的棋子
+    """
+    table = []
+    for x in range(8):
+        row = []
+        for out in range(256):
+            flipped = 0
+            for i in range(8):
+                if out >> i & 1:
+                    lo, hi = (x, i) if x < i else (i, x)
+                    for j in range(lo + 1, hi):
+                        flipped |= 1 << j
+            row.append(flipped)
+        table.append(row)
+    return table
+
+
+RAYS = _build_rays()
+OUTFLANK = _build_outflank()
+FLIPPED = _build_flipped()
+# 主对角线(左上到右下)和副对角线(右上到左下)
+DIAG = [RAYS[NW][sq] | RAYS[SE][sq] | (1 << sq) for sq in range(64)]
+ANTI_DIAG = [RAYS[NE][sq] | RAYS[SW][sq] | (1 << sq) for sq in range(64)]
+# FILE_FILL[b]：b的第j位展开成第j列；RANK_FILL[b]：b的第j位展开到第0列第j行
+FILE_FILL = [sum(FILE_A << j for j in range(8) if b >> j & 1) for b in range(256)]
+RANK_FILL = [sum(1 << (8 * j) for j in range(8) if b >> j & 1) for b in range(256)]
+
+
+# --------------------------------------public-----------------------------------------
+def get_valid_bits(my, opp):
+    """
+    可落子位置，与ReversiEnv.get_valid_pos使用同样的移位方式，只是把8个方向的函数调用展开了
+    :return pos: 64位整数
+    """
+    inner = opp & INNER
+    pos = 0
+    # 南北、东西、东北西南、西北东南四组方向，左移和右移各对应一个方向
+    for shift, o in ((8, opp), (1, inner), (7, inner), (9, inner)):
+        tmp = o & (my << shift)
+        tmp |= o & (tmp << shift)
+        tmp |= o & (tmp << shift)
+        tmp |= o & (tmp << shift)
+        tmp |= o & (tmp << shift)
+        tmp |= o & (tmp << shift)
+        pos |= tmp << shift
+
+        tmp = o & (my >> shift)
+        tmp |= o & (tmp >> shift)
+        tmp |= o & (tmp >> shift)
+        tmp |= o & (tmp >> shift)
+        tmp |= o & (tmp >> shift)
+        tmp |= o & (tmp >> shift)
+        pos |= tmp >> shift
+    return pos & ~(my | opp) & MASK
+
+
+def get_flip_bits(my, opp, sq):
+    """
+    在sq落子后被翻转的棋子。
+    对经过sq的行、列、两条对角线，分别取出这条线上的8位棋子，查表得到被翻转的棋子再放回棋盘
+    :param my: 执棋方的棋盘
+    :param opp: 对手的棋盘
+    :param sq: 落子位置
+    :return flips: 64位整数
+    """
+    x = sq & 7
+    y = sq >> 3
+    flips = 0
+
+    # 行
+    shift = sq - x
+    out = OUTFLANK[x][(opp >> shift) & 0xff] & (my >> shift)
+    if out:
+        flips |= FLIPPED[x][out] << shift
+
+    # 列
+    o = ((((opp >> x) & FILE_A) * COL_MAGIC) & MASK) >> 56
+    m = ((((my >> x) & FILE_A) * COL_MAGIC) & MASK) >> 56
+    out = OUTFLANK[y][o] & m
+    if out:
+        flips |= RANK_FILL[FLIPPED[y][out]] << x
+
+    # 主对角线
+    line = DIAG[sq]
+    o = (((opp & line) * DIAG_MAGIC) & MASK) >> 56
+    m = (((my & line) * DIAG_MAGIC) & MASK) >> 56
+    out = OUTFLANK[x][o] & m
+    if out:
+        flips |= FILE_FILL[FLIPPED[x][out]] & line
+
+    # 副对角线
+    line = ANTI_DIAG[sq]
+    o = (((opp & line) * DIAG_MAGIC) & MASK) >> 56
+    m = (((my & line) * DIAG_MAGIC) & MASK) >> 56
+    out = OUTFLANK[x][o] & m
+    if out:
+        flips |= FILE_FILL[FLIPPED[x][out]] & line
+
+    return flips
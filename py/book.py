@@ -0,0 +1,172 @@
+"""
+开局库：离线用搜索引擎展开开局树，保存每个局面的最佳落子位置，对局时查表代替搜索。
+
+局面先变换为8种对称局面中的代表(symmetry.canonical)，再连同执棋方一起哈希为64位整数。
+文件格式：8字节文件头 b'RVBK' + 版本号(1字节) + 3字节保留，
+之后是局面数n(uint64)、从小到大排好序的n个哈希值(uint64)、n个代表局面中的落子位置(uint8)，每个局面9个字节。
+查表用np.searchsorted二分查找。
+
+生成开局库：
+    python book.py --ply 6 --depth 4 --out book.bin
+"""
+import argparse
+import sys
+import time
+import numpy as np
+import symmetry
+from position import Position, iter_bits, BLACK, PASS
+from search import SearchEngine
+
+# --------------------------------------global-----------------------------------------
+MAGIC = b'RVBK'
+VERSION = 1
+HEADER_SIZE = 8
+MASK = 0xffff_ffff_ffff_ffff
+WHITE_KEY = 0x9e3779b97f4a7c15  # 白方执棋时异或到哈希值上
+
+
+def _mix(x):
+    """
+    splitmix64的最后一步，把64位整数打散
+    """
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & MASK
+    return x ^ (x >> 31)
+
+
+def position_hash(black, white, player):
+    """
+    :return h, t: 局面的64位哈希值(与对称变换无关)和变换到代表局面的变换编号
+    """
+    key, t = symmetry.canonical(black, white)
+    h = _mix((key >> 64) ^ _mix(key & MASK))
+    if player != BLACK:
+        h ^= WHITE_KEY
+    return h, t
+
+
+class OpeningBook:
+    def __init__(self, keys=None, moves=None):
+        """
+        :param keys: 从小到大排好序的哈希值，np.uint64数组
+        :param moves: 代表局面中的落子位置，np.uint8数组
+        """
+        self.keys = np.zeros(0, dtype=np.uint64) if keys is None else np.asarray(keys, dtype=np.uint64)
+        self.moves = np.zeros(0, dtype=np.uint8) if moves is None else np.asarray(moves, dtype=np.uint8)
+        self.hits = 0
+        self.misses = 0
+
+    # --------------------------------------public-----------------------------------------
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            if header[:4] != MAGIC:
+                raise ValueError("{} is not an opening book".format(path))
+            if header[4] != VERSION:
+                raise ValueError("unsupported opening book version {}".format(header[4]))
+            n = int(np.fromfile(f, dtype='<u8', count=1)[0])
+            keys = np.fromfile(f, dtype='<u8', count=n).astype(np.uint64)
+            moves = np.fromfile(f, dtype=np.uint8, count=n)
+        return cls(keys, moves)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(MAGIC + bytes([VERSION, 0, 0, 0]))
+            np.array([len(self)], dtype='<u8').tofile(f)
+            self.keys.astype('<u8').tofile(f)
+            self.moves.tofile(f)
+
+    def lookup(self, black, white, player):
+        """
+        :return pos: 开局库中的落子位置(原局面中的编号)，不在库中时为None
+        """
+        h, t = position_hash(black, white, player)
+        i = int(np.searchsorted(self.keys, np.uint64(h)))
+        if i == len(self.keys) or int(self.keys[i]) != h:
+            self.misses += 1
+            return None
+        pos = symmetry.original_move(int(self.moves[i]), t)
+        # 哈希冲突时返回的位置可能不合法，当作不在库中
+        if not Position(black, white, player).legal_bits() >> pos & 1:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pos
+
+    def think(self, env, my_color):
+        """
+        在ReversiEnv的当前棋盘上查表
+        :return pos: 不在库中时为None
+        """
+        return self.lookup(env.black_board, env.white_board, my_color)
+
+    @property
+    def nbytes(self):
+        return HEADER_SIZE + 8 + self.keys.nbytes + self.moves.nbytes
+
+    def __len__(self):
+        return self.keys.shape[0]
+
+    def __contains__(self, item):
+        """
+        :param item: (black, white, player)
+        """
+        h, _ = position_hash(*item)
+        i = int(np.searchsorted(self.keys, np.uint64(h)))
+        return i < len(self.keys) and int(self.keys[i]) == h
+
+
+def build(max_ply, engine=None, verbose=False):
+    """
+    从初始局面出发展开双方所有的落子，直到第max_ply步，用engine搜索每个局面的最佳落子位置。
+    对称的局面只搜索一次。
+    :param max_ply: 开局库覆盖的步数
+    :param engine: SearchEngine，None表示默认参数的SearchEngine
+    :return book: OpeningBook
+    """
+    engine = engine or SearchEngine()
+    entries = {}  # 哈希值 -> 代表局面中的落子位置
+    frontier = [Position()]
+    for ply in range(max_ply):
+        start = time.perf_counter()
+        children = {}
+        for position in frontier:
+            moves = position.legal_bits()
+            if not moves:
+                if not position.is_over():
+                    child = position.play(PASS)
+                    child.parent = None
+                    children.setdefault(position_hash(child.black, child.white, child.player)[0], child)
+                continue
+            h, t = position_hash(position.black, position.white, position.player)
+            _, pos = engine.search(position.black, position.white, position.player)
+            entries[h] = symmetry.canonical_move(pos, t)
+            for move in iter_bits(moves):
+                child = position.play(move)
+                child.parent = None
+                children.setdefault(position_hash(child.black, child.white, child.player)[0], child)
+        if verbose:
+            print("ply {:2d}  positions {:8d}  time {:8.2f}s".format(ply, len(frontier), time.perf_counter() - start))
+        frontier = list(children.values())
+
+    keys = np.array(sorted(entries), dtype=np.uint64)
+    moves = np.array([entries[int(h)] for h in keys], dtype=np.uint8)
+    return OpeningBook(keys, moves)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="build an opening book for ReversiEnv")
+    parser.add_argument('--ply', type=int, default=6)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--out', default='book.bin')
+    args = parser.parse_args(argv)
+
+    book = build(args.ply, SearchEngine(depth=args.depth), verbose=True)
+    book.save(args.out)
+    print("{} positions, {} bytes -> {}".format(len(book), book.nbytes, args.out))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+棋盘数组与64位棋盘之间的相互转换。
+棋盘数组即ReversiEnv.step返回的board，长度为64，黑子为-1，白子为1，空位为0，可以是float也可以是int8。
+"""
+import numpy as np
+from batch_reversi import get_valid_bits, bits_to_mask
+
+# --------------------------------------global-----------------------------------------
+BLACK = -1  # 与ReversiEnv.BLACK一致
+WHITE = 1  # 与ReversiEnv.WHITE一致
+BOARD_SIZE = 64
+TOLERANCE = 1e-6  # 与原来math.isclose的abs_tol相同
+
+
+# --------------------------------------public-----------------------------------------
+def pack_boards(boards):
+    """
+    棋盘数组转换为64位棋盘
+    :param boards: (64,)或者(N, 64)的棋盘数组
+    :return black, white: np.uint64，输入为(N, 64)时为长度N的数组
+    """
+    boards = np.asarray(boards)
+    single = boards.ndim == 1
+    boards = boards.reshape(-1, BOARD_SIZE)
+
+    if np.issubdtype(boards.dtype, np.floating):
+        black = np.abs(boards - BLACK) <= TOLERANCE
+        white = np.abs(boards - WHITE) <= TOLERANCE
+    else:
+        black = boards == BLACK
+        white = boards == WHITE
+
+    black = _pack_bits(black)
+    white = _pack_bits(white)
+    if single:
+        return black[0], white[0]
+    return black, white
+
+
+def unpack_boards(black, white, dtype=np.float64):
+    """
+    64位棋盘转换为棋盘数组，pack_boards的逆运算
+    :param black: np.uint64或者np.uint64数组
+    :param white: 与black形状相同
+    :param dtype: 棋盘数组的类型
+    :return boards: 输入为标量时为(64,)，否则为(N, 64)
+    """
+    single = np.ndim(black) == 0
+    boards = bits_to_mask(np.atleast_1d(black)).astype(dtype) * BLACK + \
+        bits_to_mask(np.atleast_1d(white)).astype(dtype) * WHITE
+    if single:
+        return boards[0]
+    return boards
+
+
+def legal_moves_from_boards(boards, colors):
+    """
+    一次计算一批棋盘数组的可落子位置
+    :param boards: (N, 64)的棋盘数组
+    :param colors: 每个棋盘执棋方的颜色，长度为N的数组或者一个颜色
+    :return mask: (N, 64)的bool数组，True表示可以落子
+    """
+    black, white = pack_boards(np.atleast_2d(boards))
+    is_black = np.asarray(colors) == BLACK
+    my = np.where(is_black, black, white)
+    opp = np.where(is_black, white, black)
+    return bits_to_mask(get_valid_bits(my, opp))
+
+
+# --------------------------------------private-----------------------------------------
+def _pack_bits(mask):
+    """
+    (N, 64)的bool数组按小端序转换为长度N的np.uint64数组
+    """
+    return np.packbits(mask, axis=1, bitorder='little').view('<u8').reshape(-1).astype(np.uint64)
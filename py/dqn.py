@@ -4,6 +4,7 @@ import random
 from collections import deque
 import time
 from reversi import ReversiEnv
+import codec
 
 GAMMA = 0.9  # targetQ保留率
 INITIAL_EPSILON = 0.1  # 起始随机游走概率
@@ -26,6 +27,7 @@ class DQN:
         self.epsilon = INITIAL_EPSILON  # 随机游走率
         self.hide_layer_nums = 256  # 隐藏层数量
         self.sess = None  # 会话
+        self.book = None  # 开局库，见set_book
 
         self.MY_COLOR = self.env.BLACK  # 我的棋子的颜色
         self.OPP_COLOR = self.env.WHITE  # 对手棋子的颜色
@@ -294,11 +296,23 @@ class DQN:
         else:  # 取权重最大的那个落子位置
             return np.argmax(Qtable)
 
+    def set_book(self, book):
+        """
+        :param book: book.OpeningBook，action会先查开局库，None表示不使用
+        """
+        self.book = book
+
     def action(self, board, my_color):
         """
         这个是用于检验效果的，所以不用随机游走
         获取落子位置
         """
+        if self.book is not None:
+            # 查的是传入的board，而不是self.env的当前棋盘
+            black, white = codec.pack_boards(board)
+            pos = self.book.lookup(int(black), int(white), my_color)
+            if pos is not None:
+                return pos
 
         Qtable = self.b_Qtable.eval(
             feed_dict={
@@ -314,6 +328,16 @@ class DQN:
 
         return np.argmax(Qtable)
 
+    def q_values(self, boards, colors):
+        """
+        一次sess.run计算一批棋盘的Q值，供mcts.MCTSPlayer批量评估叶子
+        :param boards: (N, 64)的棋盘
+        :param colors: 每个棋盘的执棋方
+        :return Qtable: (N, 64)，每行为对应执棋方的网络输出
+        """
+        b_Qtable, w_Qtable = self.sess.run([self.b_Qtable, self.w_Qtable], feed_dict={self.board_input: boards})
+        return np.where((np.asarray(colors) == self.env.BLACK)[:, None], b_Qtable, w_Qtable)
+
     def weight_variable(self, shape):
         initial = tf.truncated_normal(shape, stddev=0.01)
         return tf.Variable(initial)
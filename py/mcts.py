@@ -0,0 +1,185 @@
+"""
+PUCT蒙特卡洛树搜索，用Q网络的输出作为先验概率和局面估值。
+
+每次选择多条路径(batch_size)，沿途加上虚拟损失(virtual loss)，使同一批中的模拟走向不同的叶子；
+一批叶子的棋盘一起送入网络(一次sess.run)，然后展开并回传。
+
+用法：
+    agent = DQN(env)                         # 在会话中恢复训练好的模型之后
+    player = MCTSPlayer(agent.q_values, simulations=400)
+    pos = player.think(env, color)
+"""
+import math
+import time
+import numpy as np
+from batch_reversi import bits_to_mask
+from position import Position, BLACK, WHITE, DRAW, PASS
+
+# --------------------------------------global-----------------------------------------
+WIN_REWARD = 100  # 与ReversiEnv.step的奖励相同，Q值除以它换算为[-1, 1]的估值
+
+
+class Node:
+    __slots__ = ('position', 'moves', 'priors', 'visits', 'values', 'children', 'expanded')
+
+    def __init__(self, position):
+        self.position = position
+        self.moves = None  # 落子位置，PASS表示跳过
+        self.priors = None  # 先验概率P
+        self.visits = None  # 访问次数N
+        self.values = None  # 累计估值W，以本结点执棋方的视角
+        self.children = None
+        self.expanded = False
+
+    def expand(self, moves, priors):
+        self.moves = moves
+        self.priors = np.asarray(priors, dtype=np.float64)
+        self.visits = np.zeros(len(moves), dtype=np.float64)
+        self.values = np.zeros(len(moves), dtype=np.float64)
+        self.children = [None] * len(moves)
+        self.expanded = True
+
+
+class MCTSPlayer:
+    def __init__(self, evaluate, simulations=400, batch_size=16, c_puct=1.5, virtual_loss=1.0,
+                 prior_temperature=10.0):
+        """
+        :param evaluate: evaluate(boards, colors) -> Q值(N, 64)，boards为(N, 64)的棋盘(黑子-1，白子1)，
+            colors为每个棋盘的执棋方，例如DQN.q_values
+        :param simulations: 每步棋的模拟次数
+        :param batch_size: 每次送入网络的叶子数
+        :param c_puct: 探索系数
+        :param virtual_loss: 虚拟损失
+        :param prior_temperature: 先验概率 = softmax(Q / prior_temperature)
+        """
+        self.evaluate = evaluate
+        self.simulations = simulations
+        self.batch_size = batch_size
+        self.c_puct = c_puct
+        self.virtual_loss = virtual_loss
+        self.prior_temperature = prior_temperature
+        self.stats = {'simulations': 0, 'evaluations': 0, 'batches': 0, 'seconds': 0.0, 'visits': 0}
+
+    # --------------------------------------public-----------------------------------------
+    def search(self, position):
+        """
+        :param position: Position
+        :return pos: 访问次数最多的落子位置，无处落子时为PASS
+        """
+        start = time.perf_counter()
+        if not position.legal_bits():
+            return PASS
+        root = Node(position)
+        self.__expand(root, self.evaluate(self.__encode([position]), np.array([position.player]))[0])
+        evaluations = batches = 1
+        simulations = 0
+        while simulations < self.simulations:
+            pending = []  # [(path, leaf)]
+            leaves = set()
+            for _ in range(min(self.batch_size, self.simulations - simulations)):
+                simulations += 1
+                path, leaf = self.__select(root)
+                if leaf.position.is_over():
+                    self.__backup(path, leaf.position.player, self.__result(leaf.position))
+                elif id(leaf) in leaves:  # 同一批中重复选到的叶子，撤销这次模拟的虚拟损失
+                    self.__backup(path, leaf.position.player, None)
+                else:
+                    leaves.add(id(leaf))
+                    pending.append((path, leaf))
+            if not pending:
+                continue
+
+            boards = self.__encode([leaf.position for _, leaf in pending])
+            colors = np.array([leaf.position.player for _, leaf in pending])
+            q = np.asarray(self.evaluate(boards, colors), dtype=np.float64)
+            evaluations += len(pending)
+            batches += 1
+            for (path, leaf), q_row in zip(pending, q):
+                value = self.__expand(leaf, q_row)
+                self.__backup(path, leaf.position.player, value)
+
+        seconds = time.perf_counter() - start
+        self.stats = {
+            'simulations': simulations,
+            'evaluations': evaluations,
+            'batches': batches,
+            'seconds': seconds,
+            'visits': int(root.visits.sum()),
+        }
+        return root.moves[int(np.argmax(root.visits))]
+
+    def think(self, env, my_color):
+        """
+        在ReversiEnv的当前棋盘上为my_color一方搜索
+        :return pos: 无处落子时为-1
+        """
+        return self.search(Position.from_env(env, my_color))
+
+    # --------------------------------------private-----------------------------------------
+    def __select(self, root):
+        """
+        从根结点按PUCT选择到一个未展开的结点，沿途加上虚拟损失。无处落子的结点直接展开为一个跳过
+        :return path, leaf: path为[(node, index)]
+        """
+        path = []
+        node = root
+        while True:
+            if not node.expanded:
+                if node.position.is_over() or node.position.legal_bits():
+                    return path, node
+                node.expand([PASS], [1.0])
+            sqrt_total = math.sqrt(node.visits.sum() + 1)
+            q = np.divide(node.values, node.visits, out=np.zeros_like(node.values), where=node.visits > 0)
+            u = self.c_puct * node.priors * sqrt_total / (1 + node.visits)
+            index = int(np.argmax(q + u))
+            node.visits[index] += self.virtual_loss
+            node.values[index] -= self.virtual_loss
+            path.append((node, index))
+            child = node.children[index]
+            if child is None:
+                child = node.children[index] = Node(node.position.play(node.moves[index]))
+                child.position.parent = None
+            node = child
+
+    def __backup(self, path, player, value):
+        """
+        回传估值并撤销虚拟损失
+        :param player: value所属的一方
+        :param value: 以player的视角的估值，None表示只撤销虚拟损失
+        """
+        for node, index in path:
+            node.visits[index] -= self.virtual_loss
+            node.values[index] += self.virtual_loss
+            if value is not None:
+                node.visits[index] += 1
+                node.values[index] += value if node.position.player == player else -value
+
+    def __expand(self, leaf, q_row):
+        """
+        用网络的输出展开叶子
+        :param q_row: 叶子执棋方的64个Q值
+        :return value: 以叶子执棋方的视角的估值
+        """
+        moves = list(leaf.position.legal_moves())
+        q = q_row[moves]
+        logits = (q - q.max()) / self.prior_temperature
+        priors = np.exp(logits)
+        leaf.expand(moves, priors / priors.sum())
+        return float(np.clip(q.max() / WIN_REWARD, -1.0, 1.0))
+
+    def __result(self, position):
+        """
+        终局的估值，以执棋方的视角
+        """
+        winner = position.winner()
+        if winner == DRAW:
+            return 0.0
+        return 1.0 if winner == position.player else -1.0
+
+    def __encode(self, positions):
+        """
+        :return boards: (N, 64)的棋盘，与ReversiEnv默认的观测值相同
+        """
+        black = np.array([p.black for p in positions], dtype=np.uint64)
+        white = np.array([p.white for p in positions], dtype=np.uint64)
+        return bits_to_mask(white).astype(np.float64) * WHITE + bits_to_mask(black).astype(np.float64) * BLACK
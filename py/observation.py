@@ -0,0 +1,106 @@
+import numpy as np
+
+# --------------------------------------global-----------------------------------------
+BLACK = -1  # 与ReversiEnv.BLACK一致
+WHITE = 1  # 与ReversiEnv.WHITE一致
+BOARD_SIZE = 64
+
+FLOAT = 'float'  # 与原来相同的±1 float64向量
+INT8 = 'int8'  # ±1 int8向量
+PLANES = 'planes'  # 自己/对手/空位/可落子位置四个int8平面
+
+ENCODINGS = (FLOAT, INT8, PLANES)
+
+# BYTE_BITS[b]为字节b展开后的8个比特，低位在前，与棋盘位置的顺序一致
+BYTE_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder='little')
+
+
+class ObservationEncoder:
+    """
+    直接由64位棋盘生成观测值，结果写入调用者提供的数组，不产生临时对象
+    """
+
+    def __init__(self, encoding=FLOAT):
+        if encoding not in ENCODINGS:
+            raise ValueError("unknown encoding: {}".format(encoding))
+        self.encoding = encoding
+
+        if encoding == PLANES:
+            self.shape = (4, BOARD_SIZE)
+            self.dtype = np.int8
+        else:
+            self.shape = (BOARD_SIZE,)
+            self.dtype = np.float64 if encoding == FLOAT else np.int8
+        # 查表用的每个字节对应的值
+        self.__black_table = BYTE_BITS.astype(self.dtype) * BLACK
+        self.__white_table = BYTE_BITS.astype(self.dtype) * WHITE
+        self.__plane_table = BYTE_BITS.astype(np.int8)
+        # 预先分配的中间结果
+        self.__words = np.zeros(4, dtype='<u8')
+        self.__bytes = self.__words.view(np.uint8)
+        self.__tmp = np.zeros((8, 8), dtype=self.dtype)
+
+    # --------------------------------------public-----------------------------------------
+    @property
+    def needs_legal(self):
+        """
+        只有PLANES编码需要可落子位置
+        """
+        return self.encoding == PLANES
+
+    def allocate(self, n=None):
+        """
+        分配能够存放一个(n=None)或者n个观测值的数组
+        """
+        shape = self.shape if n is None else (n,) + self.shape
+        return np.zeros(shape, dtype=self.dtype)
+
+    def encode(self, black, white, my_color=BLACK, legal=0, out=None):
+        """
+        :param black: 64位黑棋棋盘
+        :param white: 64位白棋棋盘
+        :param my_color: PLANES编码的视角，自己的棋子在第0个平面
+        :param legal: 64位可落子位置，只有PLANES编码使用
+        :param out: 写入结果的数组，None表示新分配一个
+        :return out:
+        """
+        if out is None:
+            out = self.allocate()
+
+        words = self.__words
+        if self.encoding == PLANES:
+            my, opp = (black, white) if my_color == BLACK else (white, black)
+            words[0] = my
+            words[1] = opp
+            words[2] = ~(black | white) & 0xffff_ffff_ffff_ffff
+            words[3] = legal
+            np.take(self.__plane_table, self.__bytes, axis=0, out=out.reshape(32, 8), mode='clip')
+        else:
+            words[0] = black
+            words[1] = white
+            grid = out.reshape(8, 8)
+            np.take(self.__black_table, self.__bytes[:8], axis=0, out=grid, mode='clip')
+            np.take(self.__white_table, self.__bytes[8:16], axis=0, out=self.__tmp, mode='clip')
+            np.add(grid, self.__tmp, out=grid)
+        return out
+
+
+class ObservationRing:
+    """
+    环形缓冲区，循环使用capacity个预先分配的观测值。
+    注意第capacity个观测值会覆盖第0个，所以capacity应该大于观测值需要保存的时间
+    """
+
+    def __init__(self, encoder, capacity):
+        self.encoder = encoder
+        self.capacity = capacity
+        self.buffer = encoder.allocate(capacity)
+        self.index = 0
+
+    def next(self):
+        """
+        取出下一个可以写入的位置
+        """
+        out = self.buffer[self.index]
+        self.index = (self.index + 1) % self.capacity
+        return out
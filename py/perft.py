@@ -0,0 +1,125 @@
+"""
+perft：从初始局面出发，统计depth步之后的叶子结点数。
+用于检验ReversiEnv走法生成(get_valid_pos)和翻转(flip)的正确性，并测量其速度。
+
+用法：
+    python perft.py --depth 8                       # 计算并与已知结点数比较
+    python perft.py --depth 8 --save base.json      # 保存本次的结果作为基准
+    python perft.py --depth 8 --baseline base.json  # 与保存的基准比较速度
+"""
+import argparse
+import json
+import sys
+import time
+from reversi import ReversiEnv
+from backends import load_backend
+
+# 已知的结点数，跳过算作一步，双方都无处落子时为叶子结点
+KNOWN_NODES = {
+    1: 4,
+    2: 12,
+    3: 56,
+    4: 244,
+    5: 1396,
+    6: 8200,
+    7: 55092,
+    8: 390216,
+    9: 3005288,
+}
+
+
+def perft(depth, env=None, color=ReversiEnv.BLACK):
+    """
+    :param depth: 向前看的步数
+    :param env: ReversiEnv，None表示从初始局面开始
+    :param color: 执棋方
+    :return nodes: 叶子结点数
+    """
+    if env is None:
+        env = ReversiEnv()
+    return _perft(env, color, depth, False)
+
+
+def run(depth, env=None):
+    """
+    计算perft并计时
+    :return nodes, seconds, nps:
+    """
+    start = time.perf_counter()
+    nodes = perft(depth, env)
+    seconds = time.perf_counter() - start
+    return nodes, seconds, nodes / seconds if seconds > 0 else float('inf')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ReversiEnv perft")
+    parser.add_argument('--depth', type=int, default=7)
+    parser.add_argument('--backend', default='python', choices=['python', 'cpp', 'auto'])
+    parser.add_argument('--save', help="把结果保存为基准")
+    parser.add_argument('--baseline', help="与保存的基准比较")
+    args = parser.parse_args(argv)
+
+    backend = load_backend(args.backend)
+    print("backend:", backend.name)
+    ok = True
+    results = {}
+    for depth in range(1, args.depth + 1):
+        nodes, seconds, nps = run(depth, ReversiEnv(backend))
+        results[str(depth)] = {'nodes': nodes, 'seconds': seconds, 'nps': nps}
+        expected = KNOWN_NODES.get(depth)
+        if expected is None:
+            status = 'unknown'
+        elif nodes == expected:
+            status = 'ok'
+        else:
+            status = 'WRONG, expected {}'.format(expected)
+            ok = False
+        print("depth {:2d}  nodes {:12d}  time {:8.3f}s  {:10.0f} nodes/s  {}".format(
+            depth, nodes, seconds, nps, status))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for depth, result in results.items():
+            if depth not in baseline:
+                continue
+            base = baseline[depth]
+            if base['nodes'] != result['nodes']:
+                ok = False
+                print("depth {:>2}  nodes differ from baseline: {} != {}".format(depth, result['nodes'], base['nodes']))
+            print("depth {:>2}  speed {:.2f}x baseline".format(depth, result['nps'] / base['nps']))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0 if ok else 1
+
+
+# --------------------------------------private-----------------------------------------
+def _perft(env, color, depth, passed):
+    """
+    :param passed: 上一步是否跳过
+    """
+    if depth == 0:
+        return 1
+
+    valid_pos = env.get_valid_pos(color)
+    if not valid_pos:
+        if passed:  # 双方都无处落子，游戏结束
+            return 1
+        return _perft(env, -color, depth - 1, True)
+    if depth == 1:
+        return len(valid_pos)
+
+    black, white = env.black_board, env.white_board
+    nodes = 0
+    for pos in valid_pos:
+        env.flip(pos, color)
+        nodes += _perft(env, -color, depth - 1, False)
+        env.black_board, env.white_board = black, white  # 回溯
+    return nodes
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+供搜索使用的轻量级局面。
+与ReversiEnv不同，Position创建之后不再修改，play返回新的局面，undo返回上一个局面。
+"""
+import bitboard
+
+# --------------------------------------global-----------------------------------------
+BLACK = -1  # 与ReversiEnv一致
+WHITE = 1
+DRAW = 65535
+GAMING = 65534
+PASS = -1  # 跳过
+
+INIT_BLACK = (1 << (3 * 8 + 4)) | (1 << (4 * 8 + 3))
+INIT_WHITE = (1 << (3 * 8 + 3)) | (1 << (4 * 8 + 4))
+FULL = bitboard.MASK
+
+if hasattr(int, 'bit_count'):
+    def popcount(x):
+        """
+        x中比特1的个数
+        """
+        return x.bit_count()
+else:  # python3.10之前没有int.bit_count
+    def popcount(x):
+        """
+        x中比特1的个数
+        """
+        return bin(x).count('1')
+
+
+def iter_bits(x):
+    """
+    从低位到高位依次取出x中为1的位置
+    """
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+class Position:
+    __slots__ = ('black', 'white', 'player', 'skip_count', 'parent')
+
+    def __init__(self, black=INIT_BLACK, white=INIT_WHITE, player=BLACK, skip_count=0, parent=None):
+        """
+        :param black: 64位黑棋棋盘
+        :param white: 64位白棋棋盘
+        :param player: 执棋方
+        :param skip_count: 连续跳过的次数
+        :param parent: 上一个局面，供undo使用
+        """
+        self.black = black
+        self.white = white
+        self.player = player
+        self.skip_count = skip_count
+        self.parent = parent
+
+    @classmethod
+    def from_env(cls, env, player):
+        """
+        由ReversiEnv的当前棋盘生成局面
+        :param env: ReversiEnv
+        :param player: 执棋方
+        """
+        return cls(env.black_board, env.white_board, player, env.skip_count)
+
+    # --------------------------------------public-----------------------------------------
+    def my_board(self):
+        return self.black if self.player == BLACK else self.white
+
+    def opp_board(self):
+        return self.white if self.player == BLACK else self.black
+
+    def empty(self):
+        return ~(self.black | self.white) & FULL
+
+    def legal_bits(self):
+        """
+        执棋方的可落子位置，64位整数
+        """
+        if self.player == BLACK:
+            return bitboard.get_valid_bits(self.black, self.white)
+        return bitboard.get_valid_bits(self.white, self.black)
+
+    def legal_moves(self):
+        """
+        执棋方的可落子位置，从小到大依次返回
+        """
+        return iter_bits(self.legal_bits())
+
+    def play(self, move):
+        """
+        :param move: 落子位置，PASS表示跳过
+        :return position: 落子之后的局面
+        """
+        if move == PASS:
+            return Position(self.black, self.white, -self.player, self.skip_count + 1, self)
+
+        if self.player == BLACK:
+            flips = bitboard.get_flip_bits(self.black, self.white, move)
+            return Position(self.black | (1 << move) | flips, self.white ^ flips, WHITE, 0, self)
+        flips = bitboard.get_flip_bits(self.white, self.black, move)
+        return Position(self.black ^ flips, self.white | (1 << move) | flips, BLACK, 0, self)
+
+    def undo(self):
+        """
+        :return position: 落子之前的局面
+        """
+        if self.parent is None:
+            raise ValueError("no move to undo")
+        return self.parent
+
+    def is_over(self):
+        """
+        与ReversiEnv.is_over相同
+        """
+        return self.skip_count >= 2 or not self.empty()
+
+    def winner(self):
+        if not self.is_over():
+            return GAMING
+        black_piece = popcount(self.black)
+        white_piece = popcount(self.white)
+        if black_piece > white_piece:
+            return BLACK
+        elif black_piece == white_piece:
+            return DRAW
+        return WHITE
+
+    def count(self, color):
+        """
+        color一方的棋子数
+        """
+        return popcount(self.black if color == BLACK else self.white)
+
+    def key(self):
+        return self.black, self.white, self.player, self.skip_count
+
+    def __eq__(self, other):
+        return isinstance(other, Position) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return "Position(black={:#018x}, white={:#018x}, player={}, skip_count={})".format(
+            self.black, self.white, self.player, self.skip_count)
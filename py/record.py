@@ -0,0 +1,281 @@
+"""
+对局记录的二进制格式。
+
+文件开头为8字节的文件头：b'RVGR' + 版本号(1字节) + 3字节保留。
+之后依次存放每盘棋：
+    长度n(uint8) + 结果(int8，BLACK=-1，WHITE=1，平局为0) + n个落子位置(uint8，0~63，PASS_MARK表示跳过)
+一盘棋一般只需要六十多个字节，上百万盘棋也只有几十MB。
+旁边的索引文件(文件名加INDEX_SUFFIX)依次保存每盘棋在文件中的位置(int64)，读取时不必逐盘扫描长度字节。
+写入中断时文件末尾可能有一盘没有写完的棋，读取时忽略，再次打开写入时截掉。
+"""
+import os
+import numpy as np
+from batch_reversi import get_flip_bits, count_bits, bits_to_mask, square_bits
+
+# --------------------------------------global-----------------------------------------
+MAGIC = b'RVGR'
+VERSION = 1
+HEADER_SIZE = 8
+PASS_MARK = 64  # 跳过
+MAX_LENGTH = 255
+INDEX_SUFFIX = '.idx'
+
+BLACK = -1  # 与ReversiEnv一致
+WHITE = 1
+DRAW = 65535
+GAMING = 65534
+
+WIN_REWARD = 100  # 与ReversiEnv.step相同
+LOSE_REWARD = -100
+
+INIT_BLACK = np.uint64((1 << (3 * 8 + 4)) | (1 << (4 * 8 + 3)))
+INIT_WHITE = np.uint64((1 << (3 * 8 + 3)) | (1 << (4 * 8 + 4)))
+
+
+def encode_result(winner):
+    """
+    ReversiEnv.winner()的返回值转换为记录中的结果
+    """
+    if winner == BLACK or winner == WHITE:
+        return winner
+    return 0
+
+
+def scan_offsets(data, start):
+    """
+    从start开始依次扫描长度字节，得到每盘棋的位置
+    :param data: 整个文件的uint8数组
+    :return offsets, end: end为最后一盘完整的棋结束的位置，之后是没有写完的棋局
+    """
+    offsets = []
+    pos = start
+    size = data.shape[0]
+    while pos + 2 <= size and pos + 2 + int(data[pos]) <= size:
+        offsets.append(pos)
+        pos += 2 + int(data[pos])
+    return offsets, pos
+
+
+def load_offsets(data, path):
+    """
+    从索引文件中读取每盘棋的位置，索引之后的棋局(没有索引的旧文件、写入索引之前中断)再扫描得到。
+    索引与文件不一致时(例如文件被替换)重新扫描整个文件
+    :return offsets, end: 同scan_offsets
+    """
+    size = data.shape[0]
+    offsets = np.zeros(0, dtype=np.int64)
+    if os.path.exists(path + INDEX_SUFFIX):
+        offsets = np.fromfile(path + INDEX_SUFFIX, dtype='<i8').astype(np.int64)
+        # 索引可能比文件先写入磁盘，只保留文件中完整的棋局
+        offsets = offsets[:_prefix((offsets >= HEADER_SIZE) & (offsets + 2 <= size))]
+        ends = offsets + 2 + data[offsets].astype(np.int64)
+        n = _prefix(ends <= size)
+        offsets, ends = offsets[:n], ends[:n]
+        if len(offsets) and (offsets[0] != HEADER_SIZE or not np.array_equal(offsets[1:], ends[:-1])):
+            offsets = np.zeros(0, dtype=np.int64)
+    start = int(offsets[-1]) + 2 + int(data[offsets[-1]]) if len(offsets) else HEADER_SIZE
+    tail, end = scan_offsets(data, start)
+    return np.concatenate([offsets, np.array(tail, dtype=np.int64)]), end
+
+
+def _prefix(mask):
+    """
+    :return n: mask开头连续为True的个数
+    """
+    return len(mask) if mask.all() else int(np.argmin(mask))
+
+
+class GameRecordWriter:
+    """
+    以追加的方式写入对局记录。
+    可以通过ReversiEnv.set_recorder挂到环境上，reset时开始记录，棋局结束时写入
+    """
+
+    def __init__(self, path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        offsets = np.zeros(0, dtype=np.int64)
+        if not new_file:
+            data = np.memmap(path, dtype=np.uint8, mode='r')
+            size = data.shape[0]
+            offsets, end = load_offsets(data, path)
+            del data
+            if end < size:  # 丢弃上次中断时没有写完的棋局
+                os.truncate(path, end)
+        self.file = open(path, 'ab')
+        if new_file:
+            self.file.write(MAGIC + bytes([VERSION, 0, 0, 0]))
+        offsets.astype('<i8').tofile(path + INDEX_SUFFIX)
+        self.index = open(path + INDEX_SUFFIX, 'ab')
+        self.moves = None  # 正在记录的棋局，None表示没有
+        self.games = 0
+
+    # --------------------------------------public-----------------------------------------
+    def begin(self):
+        """
+        开始记录新的一盘棋，之前没有结束的棋局会被丢弃
+        """
+        self.moves = bytearray()
+
+    def add(self, move):
+        """
+        :param move: 落子位置，-1表示跳过
+        """
+        if self.moves is not None:
+            self.moves.append(PASS_MARK if move < 0 else move)
+
+    def end(self, winner):
+        """
+        结束当前棋局并写入文件
+        :param winner: ReversiEnv.winner()的返回值
+        """
+        if self.moves is not None:
+            self.write_game(self.moves, winner)
+        self.moves = None
+
+    def write_game(self, moves, winner):
+        """
+        直接写入一盘完整的棋
+        :param moves: 落子位置序列，-1或PASS_MARK表示跳过
+        """
+        moves = bytes(PASS_MARK if move < 0 else move for move in moves)
+        if len(moves) > MAX_LENGTH:
+            raise ValueError("game too long: {} moves".format(len(moves)))
+        offset = self.file.tell()
+        self.file.write(bytes([len(moves), encode_result(winner) & 0xff]) + moves)
+        self.index.write(offset.to_bytes(8, 'little'))
+        self.games += 1
+
+    def flush(self):
+        self.file.flush()
+        self.index.flush()
+
+    def close(self):
+        self.file.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class GameRecordReader:
+    """
+    通过np.memmap读取对局记录，不会把整个文件读入内存。
+    末尾没有写完的棋局被忽略，partial为忽略的字节数
+    """
+
+    def __init__(self, path):
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(self.data[:4]) != MAGIC:
+            raise ValueError("{} is not a game record file".format(path))
+        if self.data[4] != VERSION:
+            raise ValueError("unsupported game record version {}".format(self.data[4]))
+
+        self.offsets, end = load_offsets(self.data, path)
+        self.partial = self.data.shape[0] - end
+        self.lengths = self.data[self.offsets].astype(np.int64)
+        self.results = self.data[self.offsets + 1].view(np.int8).astype(np.int64)
+
+    # --------------------------------------public-----------------------------------------
+    def __len__(self):
+        return self.offsets.shape[0]
+
+    def moves(self, index):
+        """
+        :return moves: 第index盘棋的落子位置，PASS_MARK表示跳过
+        """
+        start = self.offsets[index] + 2
+        return self.data[start:start + self.lengths[index]]
+
+    def move_matrix(self):
+        """
+        :return moves: (games, max_length)的数组，棋局结束之后用-1填充
+        """
+        max_length = int(self.lengths.max()) if len(self) else 0
+        column = np.arange(max_length)
+        index = self.offsets[:, None] + 2 + column
+        valid = column < self.lengths[:, None]
+        moves = self.data[np.where(valid, index, 0)].astype(np.int64)
+        return np.where(valid, moves, -1)
+
+    def transitions(self, dtype=np.int8):
+        """
+        重放所有棋局，得到与ReversiEnv.step相同的(state, action, reward, next_state, terminal)。
+        所有棋局同时一步一步地重放，跳过不产生数据，与dqn.py中的经验池一致。
+        :param dtype: 棋盘数组的类型
+        :return: dict，包括
+            states, next_states: (T, 64)，黑子-1，白子1
+            actions: (T,)落子位置
+            rewards: (T,)执棋方得到的奖励
+            terminals: (T,)step返回的胜利方，GAMING表示未结束
+            games: (T,)来自第几盘棋
+        """
+        moves = self.move_matrix()
+        num_games = moves.shape[0]
+        total = int(np.count_nonzero((moves >= 0) & (moves != PASS_MARK)))
+
+        states = np.zeros((total, 64), dtype=dtype)
+        next_states = np.zeros((total, 64), dtype=dtype)
+        actions = np.zeros(total, dtype=np.int64)
+        rewards = np.zeros(total, dtype=np.int64)
+        terminals = np.zeros(total, dtype=np.int64)
+        games = np.zeros(total, dtype=np.int64)
+
+        black = np.full(num_games, INIT_BLACK, dtype=np.uint64)
+        white = np.full(num_games, INIT_WHITE, dtype=np.uint64)
+        player = np.full(num_games, BLACK, dtype=np.int64)
+        count = 0
+        for ply in range(moves.shape[1]):
+            move = moves[:, ply]
+            active = move >= 0
+            played = active & (move != PASS_MARK)
+            index = np.flatnonzero(played)
+            n = index.shape[0]
+
+            if n:
+                states[count:count + n] = self.__to_array(black[index], white[index], dtype)
+
+                is_black = player[index] == BLACK
+                my = np.where(is_black, black[index], white[index])
+                opp = np.where(is_black, white[index], black[index])
+                bit = square_bits(move[index])
+                flips = get_flip_bits(my, opp, bit)
+                my = (my | bit) ^ flips
+                opp = opp ^ flips
+                black[index] = np.where(is_black, my, opp)
+                white[index] = np.where(is_black, opp, my)
+
+                next_states[count:count + n] = self.__to_array(black[index], white[index], dtype)
+                actions[count:count + n] = move[index]
+                games[count:count + n] = index
+
+                # 落子之后只有棋盘下满才会结束
+                black_piece = count_bits(black[index])
+                white_piece = count_bits(white[index])
+                full = black_piece + white_piece == 64
+                winner = np.where(black_piece > white_piece, BLACK,
+                                  np.where(black_piece == white_piece, DRAW, WHITE))
+                winner = np.where(full, winner, GAMING)
+                mover = player[index]
+                reward = np.where(winner == mover, WIN_REWARD, 0)
+                reward = np.where(full & (winner != mover) & (winner != DRAW), LOSE_REWARD, reward)
+                rewards[count:count + n] = reward
+                terminals[count:count + n] = winner
+                count += n
+
+            player = np.where(active, -player, player)
+
+        return {
+            'states': states,
+            'actions': actions,
+            'rewards': rewards,
+            'next_states': next_states,
+            'terminals': terminals,
+            'games': games,
+        }
+
+    # --------------------------------------private-----------------------------------------
+    def __to_array(self, black, white, dtype):
+        return bits_to_mask(black).astype(dtype) * BLACK + bits_to_mask(white).astype(dtype) * WHITE
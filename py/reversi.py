@@ -1,5 +1,7 @@
-import numpy as np
-import math
+from observation import ObservationEncoder, ObservationRing, FLOAT
+import codec
+from backends import PythonBackend
+from endgame import EndgameSolver
 
 
 class ReversiEnv:
@@ -12,7 +14,11 @@ class ReversiEnv:
     BOARD_SIZE = 64
     MASK = 0xffff_ffff_ffff_ffff
 
-    def __init__(self):
+    def __init__(self, backend=None):
+        """
+        :param backend: 计算后端，见backends.py，None表示使用纯python后端
+        """
+        self.backend = backend if backend is not None else PythonBackend()
         self.black_board = 0
         self.white_board = 0
         self.skip_count = 0
@@ -21,11 +27,12 @@ class ReversiEnv:
         self.black_board |= (1 << self.__get_index(3, 4)) | (1 << self.__get_index(4, 3))
         self.white_board |= (1 << self.__get_index(3, 3)) | (1 << self.__get_index(4, 4))
 
-        self.directions = [self.__to_n, self.__to_s, self.__to_w, self.__to_e, self.__to_nw, self.__to_ne, self.__to_sw,
-                           self.__to_se]
-
         self.viewer = None
 
+        self.encoder = ObservationEncoder(FLOAT)  # 观测值的编码方式
+        self.ring = None  # 观测值的环形缓冲区，None表示每次都新分配
+        self.recorder = None  # 对局记录，见record.py
+
     # --------------------------------------public-----------------------------------------
     def get_valid_pos(self, my_color):
         """
@@ -33,67 +40,32 @@ class ReversiEnv:
         :param my_color: 我的棋子的颜色
         :return valid_pos: 能够落子的位置
         """
-        pos = 0
-        emp = self.__get_empty()
-
-        if my_color == self.BLACK:
-            my = self.black_board
-            opp = self.white_board
-        else:
-            my = self.white_board
-            opp = self.black_board
-
-        for i in range(8):
-            tmp = self.directions[i](my) & opp & self.MASK
-            for j in range(5):
-                tmp |= self.directions[i](tmp) & opp
-            pos |= self.directions[i](tmp) & emp
-
-        return self.board_to_list(pos)
+        return self.board_to_list(self.__get_valid_bits(my_color))
 
     def get_availble_pos(self, my_color, board):
         '''
         功能和get_valid_pos相同
         只不过计算的是board能下棋的位置
         '''
-        pos = 0
-        emp = self.__get_empty()
-
-        my = 0
-        opp = 0
-        for i in range(self.BOARD_SIZE):
-            if math.isclose(board[i], my_color, abs_tol=1e-6):
-                my |= (1 << i)
-            elif math.isclose(board[i], -my_color, abs_tol=1e-6):
-                opp |= (1 << i)
-
-        for i in range(8):
-            tmp = self.directions[i](my) & opp & self.MASK
-            for j in range(5):
-                tmp |= self.directions[i](tmp) & opp
-            pos |= self.directions[i](tmp) & emp
+        black, white = codec.pack_boards(board)
+        if my_color == self.BLACK:
+            pos = self.backend.get_valid_bits(int(black), int(white))
+        else:
+            pos = self.backend.get_valid_bits(int(white), int(black))
 
         return self.board_to_list(pos)
 
     def flip(self, action, color):
         if color == self.BLACK:
-            my = self.black_board | (1 << action)
+            my = self.black_board
             opp = self.white_board
         elif color == self.WHITE:
-            my = self.white_board | (1 << action)
+            my = self.white_board
             opp = self.black_board
 
-        pos = 1 << action
-        for i in range(8):
-            tmp = self.directions[i](pos)
-            mask = 0
-            while tmp & opp:
-                mask |= tmp
-                tmp = self.directions[i](tmp)
-
-            if tmp & my:
-                my = (my ^ mask) & self.MASK
-                opp = (opp ^ mask) & self.MASK
+        mask = self.backend.get_flip_bits(my, opp, action)
+        my = my | (1 << action) | mask
+        opp = opp ^ mask
 
         if color == self.BLACK:
             self.black_board = my
@@ -116,8 +88,8 @@ class ReversiEnv:
 
     def winner(self):
         if self.is_over():
-            black_piece = self.__count_bits(self.black_board)
-            white_piece = self.__count_bits(self.white_board)
+            black_piece = self.backend.count_bits(self.black_board)
+            white_piece = self.backend.count_bits(self.white_board)
             if black_piece > white_piece:
                 return self.BLACK
             elif black_piece == white_piece:
@@ -127,6 +99,21 @@ class ReversiEnv:
         else:
             return self.GAMING
 
+    def search(self, my_color, depth=4):
+        """
+        使用后端的搜索算法找到当前棋盘上my_color一方的最佳落子位置
+        :return pos: 无处落子时为-1
+        """
+        return self.backend.search(self.black_board, self.white_board, my_color, depth)
+
+    def solve(self, my_color, wld=False):
+        """
+        残局精确求解，空位较多时会很慢，一般在空位不超过endgame.DEFAULT_EMPTIES时使用
+        :param wld: True表示只判断胜负平
+        :return score, pos: 双方都下最优时my_color一方最终的棋子差(wld时为1、0、-1)和最佳落子位置，无处落子时pos为-1
+        """
+        return EndgameSolver(wld).think(self, my_color)
+
     def skip(self):
         self.skip_count += 1
 
@@ -150,8 +137,12 @@ class ReversiEnv:
             self.flip(action[0], action[1])
         else:
             self.skip()
-        board = self.__get_board()
+        board = self.__get_board(action[2])
         winner = self.winner()
+        if self.recorder is not None:
+            self.recorder.add(action[0])
+            if winner != self.GAMING:
+                self.recorder.end(winner)
         if winner == action[2]:
             return board, win_reward, winner
         elif winner == self.DRAW:
@@ -169,7 +160,38 @@ class ReversiEnv:
         self.black_board |= (1 << self.__get_index(3, 4)) | (1 << self.__get_index(4, 3))
         self.white_board |= (1 << self.__get_index(3, 3)) | (1 << self.__get_index(4, 4))
 
-        return self.__get_board()
+        if self.recorder is not None:
+            self.recorder.begin()
+        return self.__get_board(self.BLACK)
+
+    def set_recorder(self, recorder):
+        """
+        记录之后每一盘棋，从下一次reset开始
+        :param recorder: record.GameRecordWriter，None表示不再记录
+        """
+        self.recorder = recorder
+
+    def set_observation(self, encoding=FLOAT, capacity=0):
+        """
+        设置step和reset返回的观测值
+        :param encoding: FLOAT、INT8或者PLANES
+        :param capacity: 环形缓冲区的大小，0表示每次都新分配一个观测值。
+            大于0时step不再分配内存，但是返回的观测值在capacity次之后会被覆盖
+        """
+        self.encoder = ObservationEncoder(encoding)
+        self.ring = ObservationRing(self.encoder, capacity) if capacity > 0 else None
+
+    def observe(self, my_color=BLACK, out=None):
+        """
+        把当前棋盘编码后写入out
+        :param my_color: PLANES编码的视角
+        :param out: 写入的数组，None表示使用环形缓冲区或者新分配
+        :return out:
+        """
+        if out is None and self.ring is not None:
+            out = self.ring.next()
+        legal = self.__get_valid_bits(my_color) if self.encoder.needs_legal else 0
+        return self.encoder.encode(self.black_board, self.white_board, my_color, legal, out)
 
     def board_to_list(self, board):
         """
@@ -184,7 +206,6 @@ class ReversiEnv:
         return res
 
     def render(self):
-        board = self.__get_board()
         print(' ', end=' ')
         for i in range(self.BOARD_WIDTH):
             print(i, end=' ')
@@ -192,42 +213,26 @@ class ReversiEnv:
         for i in range(self.BOARD_WIDTH):
             print(i, end=' ')
             for j in range(self.BOARD_WIDTH):
-                if board[i * self.BOARD_WIDTH + j] == self.BLACK:
+                if self.black_board >> self.__get_index(i, j) & 1:
                     print("*", end=' ')
-                elif board[i * self.BOARD_WIDTH + j] == self.WHITE:
+                elif self.white_board >> self.__get_index(i, j) & 1:
                     print("O", end=' ')
                 else:
                     print("-", end=' ')
             print()
 
     # --------------------------------------private-----------------------------------------
+    def __get_valid_bits(self, my_color):
+        """
+        用64位整数表示的可落子位置
+        """
+        if my_color == self.BLACK:
+            return self.backend.get_valid_bits(self.black_board, self.white_board)
+        return self.backend.get_valid_bits(self.white_board, self.black_board)
+
     def __get_empty(self):
         return (~ (self.black_board | self.white_board)) & self.MASK
 
-    def __to_n(self, x):
-        return (x >> 8) & self.MASK
-
-    def __to_s(self, x):
-        return (x << 8) & self.MASK
-
-    def __to_w(self, x):
-        return ((x & 0xfefefefefefefefe) >> 1) & self.MASK
-
-    def __to_e(self, x):
-        return ((x & 0x7f7f7f7f7f7f7f7f) << 1) & self.MASK
-
-    def __to_nw(self, x):
-        return self.__to_n(self.__to_w(x))
-
-    def __to_ne(self, x):
-        return self.__to_n(self.__to_e(x))
-
-    def __to_sw(self, x):
-        return self.__to_s(self.__to_w(x))
-
-    def __to_se(self, x):
-        return self.__to_s(self.__to_e(x))
-
     def __get_index(self, x, y):
         return x * self.BOARD_WIDTH + y
 
@@ -243,25 +248,5 @@ class ReversiEnv:
     def __low_bit_index(self, x):
         return self.__low_bit(x).bit_length() - 1
 
-    '''
-    https://stackoverflow.com/questions/9829578/fast-way-of-counting-non-zero-bits-in-positive-integer
-    '''
-
-    def __count_bits(self, x):
-        x = (x & 0x5555555555555555) + ((x & 0xaaaaaaaaaaaaaaaa) >> 1)
-        x = (x & 0x3333333333333333) + ((x & 0xcccccccccccccccc) >> 2)
-        x = (x & 0x0f0f0f0f0f0f0f0f) + ((x & 0xf0f0f0f0f0f0f0f0) >> 4)
-        x = (x & 0x00ff00ff00ff00ff) + ((x & 0xff00ff00ff00ff00) >> 8)
-        x = (x & 0x0000ffff0000ffff) + ((x & 0xffff0000ffff0000) >> 16)
-        x = (x & 0x00000000ffffffff) + ((x & 0xffffffff00000000) >> 32)
-        return x
-
-    def __get_board(self):
-        black_list = np.array(self.board_to_list(self.black_board))
-        white_list = np.array(self.board_to_list(self.white_board))
-        board = np.zeros([self.BOARD_SIZE])
-        if len(black_list):
-            board[black_list] = self.BLACK
-        if len(white_list):
-            board[white_list] = self.WHITE
-        return board
+    def __get_board(self, my_color):
+        return self.observe(my_color)
@@ -0,0 +1,193 @@
+"""
+直接在64位棋盘上进行的negamax alpha-beta搜索。
+估价函数与training/ai_v2_4train.py中AIV2.evaluate的结构相同，由五项加权组成：
+奇偶性、稳定点、行动力、棋子数、位置权重。
+"""
+import time
+import bitboard
+from position import popcount, iter_bits, BLACK
+from endgame import EndgameSolver
+
+# --------------------------------------global-----------------------------------------
+INF = float('inf')
+WIN_SCORE = 10000  # 终局时每个棋子差的得分，远大于估价函数的范围
+
+# 与cpp/Reversi.cpp中的early_weight相同
+POS_WEIGHT = (
+    20, -20, 3, -15, -15, 3, -20, 20,
+    -20, -5, -10, -2, -2, -10, -5, -20,
+    3, -10, 11, 6, 6, 11, -10, 3,
+    -15, -2, 6, 1, 1, 6, -2, -15,
+    -15, -2, 6, 1, 1, 6, -2, -15,
+    3, -10, 11, 6, 6, 11, -10, 3,
+    -20, -5, -10, -2, -2, -10, -5, -20,
+    20, -20, 3, -15, -15, 3, -20, 20)
+
+# ROW_WEIGHT[row][b]：第row行的棋子为b(8位)时的位置权重之和，按行查表代替逐个棋子相加
+ROW_WEIGHT = [[sum(POS_WEIGHT[row * 8 + j] for j in range(8) if b >> j & 1) for b in range(256)]
+              for row in range(8)]
+
+CORNERS = (1 << 0) | (1 << 7) | (1 << 56) | (1 << 63)
+EDGES = (0xff, 0xff << 56, bitboard.FILE_A, bitboard.FILE_A << 7)  # 上下左右四条边
+
+
+class SearchAbort(Exception):
+    """
+    结点数超出预算时中止搜索
+    """
+    pass
+
+
+class SearchEngine:
+    def __init__(self, weights=(0.5, 0.5, 0.5, 0.5, 0.5), depth=4, node_limit=None, endgame_empties=0):
+        """
+        :param weights: 五项估价函数的权重，顺序与AIV2.evaluate相同
+        :param depth: 最大搜索深度
+        :param node_limit: 结点数预算，None表示不限制。有预算时使用迭代加深，返回最后一次完整搜索的结果，
+            第一层不受预算限制
+        :param endgame_empties: 空位数不超过这个值时改用EndgameSolver精确求解，0表示不使用
+        """
+        self.weights = weights
+        self.depth = depth
+        self.node_limit = node_limit
+        self.endgame_empties = endgame_empties
+
+        self.nodes = 0
+        self.stats = {'depth': 0, 'nodes': 0, 'seconds': 0.0, 'nps': 0.0}
+
+    # --------------------------------------public-----------------------------------------
+    def search(self, black, white, player, depth=None, node_limit=None):
+        """
+        :param black: 64位黑棋棋盘
+        :param white: 64位白棋棋盘
+        :param player: 执棋方
+        :param depth: 搜索深度，None表示使用self.depth
+        :param node_limit: 结点数预算，None表示使用self.node_limit
+        :return score, pos: 执棋方的得分和最佳落子位置，无处落子时pos为-1
+        """
+        depth = self.depth if depth is None else depth
+        node_limit = self.node_limit if node_limit is None else node_limit
+        my, opp = (black, white) if player == BLACK else (white, black)
+
+        self.nodes = 0
+        start = time.perf_counter()
+        moves = bitboard.get_valid_bits(my, opp)
+        empties = popcount(~(my | opp) & bitboard.MASK)
+        if empties <= self.endgame_empties:
+            # 残局：搜索到终局，棋子差换算成与终局结点相同的得分
+            solver = EndgameSolver()
+            score, pos = solver.best_move(my, opp)
+            self.nodes = solver.nodes
+            result = (score * WIN_SCORE, pos)
+            reached = empties
+        elif not moves:
+            result = (self.__negamax(my, opp, depth, -INF, INF, None), -1)
+            reached = depth
+        elif node_limit is None:
+            result = self.__root(my, opp, moves, depth, None, None)
+            reached = depth
+        else:
+            # 迭代加深，超出预算时使用上一次完整搜索的结果。第一层一定搜完，保证得分是经过搜索的
+            result = self.__root(my, opp, moves, 1, None, None)
+            reached = 1
+            for d in range(2, depth + 1):
+                try:
+                    result = self.__root(my, opp, moves, d, result[1], node_limit)
+                    reached = d
+                except SearchAbort:
+                    break
+        seconds = time.perf_counter() - start
+        self.stats = {
+            'depth': reached,
+            'nodes': self.nodes,
+            'seconds': seconds,
+            'nps': self.nodes / seconds if seconds > 0 else 0.0,
+        }
+        return result
+
+    def think(self, env, my_color):
+        """
+        在ReversiEnv的当前棋盘上为my_color一方搜索落子位置
+        :return pos: 无处落子时为-1
+        """
+        return self.search(env.black_board, env.white_board, my_color)[1]
+
+    def evaluate(self, my, opp, moves):
+        """
+        五项估价函数的加权和，均为执棋方的得分
+        :param my: 执棋方的棋盘
+        :param opp: 对手的棋盘
+        :param moves: 执棋方的可落子位置
+        """
+        w = self.weights
+        empty = ~(my | opp) & bitboard.MASK
+        # 奇偶性：空位为奇数时执棋方下最后一步
+        parity = 1 if popcount(empty) & 1 else -1
+        # 稳定点：四个角，以及已经下满的边上的棋子
+        stable = popcount(my & CORNERS) - popcount(opp & CORNERS)
+        for edge in EDGES:
+            if not edge & empty:
+                stable += popcount(my & edge & ~CORNERS) - popcount(opp & edge & ~CORNERS)
+        # 行动力
+        mobility = popcount(moves) - popcount(bitboard.get_valid_bits(opp, my))
+        # 棋子数
+        disc = popcount(my) - popcount(opp)
+        # 位置权重
+        position = 0
+        for row in range(8):
+            shift = row * 8
+            position += ROW_WEIGHT[row][(my >> shift) & 0xff] - ROW_WEIGHT[row][(opp >> shift) & 0xff]
+        return w[0] * parity + w[1] * stable + w[2] * mobility + w[3] * disc + w[4] * position
+
+    # --------------------------------------private-----------------------------------------
+    def __root(self, my, opp, moves, depth, first, node_limit):
+        """
+        根结点，first为优先搜索的位置(上一次迭代的最佳位置)
+        """
+        order = self.__order(moves)
+        if first is not None and first in order:
+            order.remove(first)
+            order.insert(0, first)
+
+        best_score = -INF
+        best_pos = order[0]
+        for sq in order:
+            flips = bitboard.get_flip_bits(my, opp, sq)
+            score = -self.__negamax(opp ^ flips, my | flips | (1 << sq), depth - 1, -INF, -best_score, node_limit)
+            if score > best_score:
+                best_score = score
+                best_pos = sq
+        return best_score, best_pos
+
+    def __negamax(self, my, opp, depth, alpha, beta, node_limit):
+        self.nodes += 1
+        if node_limit is not None and self.nodes > node_limit:
+            raise SearchAbort()
+
+        moves = bitboard.get_valid_bits(my, opp)
+        if not moves:
+            if not bitboard.get_valid_bits(opp, my):  # 双方都无处落子，游戏结束
+                return (popcount(my) - popcount(opp)) * WIN_SCORE
+            if depth <= 0:
+                return self.evaluate(my, opp, moves)
+            # 跳过，轮到对方
+            return -self.__negamax(opp, my, depth - 1, -beta, -alpha, node_limit)
+        if depth <= 0:
+            return self.evaluate(my, opp, moves)
+
+        best_score = -INF
+        for sq in self.__order(moves):
+            flips = bitboard.get_flip_bits(my, opp, sq)
+            score = -self.__negamax(opp ^ flips, my | flips | (1 << sq), depth - 1, -beta, -max(alpha, best_score),
+                                    node_limit)
+            if score > best_score:
+                best_score = score
+                if best_score >= beta:  # 剪枝
+                    break
+        return best_score
+
+    def __order(self, moves):
+        """
+        落子顺序：位置权重高的先搜索，有利于剪枝
+        """
+        return sorted(iter_bits(moves), key=lambda sq: -POS_WEIGHT[sq])
@@ -0,0 +1,181 @@
+"""
+棋盘的8种对称变换(旋转和翻转)。
+棋盘编号与ReversiEnv相同，第i位表示第i // 8行第i % 8列。
+变换编号t的三个比特依次表示：先沿主对角线翻转(4)，再上下翻转(2)，最后左右翻转(1)。
+"""
+import numpy as np
+
+# --------------------------------------global-----------------------------------------
+MASK = 0xffff_ffff_ffff_ffff
+PASS = -1
+NUM_TRANSFORMS = 8
+
+K1 = 0x5555555555555555
+K2 = 0x3333333333333333
+K4 = 0x0f0f0f0f0f0f0f0f
+K8 = 0x00ff00ff00ff00ff
+K16 = 0x0000ffff0000ffff
+D1 = 0x5500550055005500
+D2 = 0x3333000033330000
+D4 = 0x0f0f0f0f00000000
+
+U = {name: np.uint64(value) for name, value in
+     (('K1', K1), ('K2', K2), ('K4', K4), ('K8', K8), ('K16', K16), ('D1', D1), ('D2', D2), ('D4', D4))}
+S = {n: np.uint64(n) for n in (1, 2, 4, 7, 8, 14, 16, 28, 32)}
+
+
+# --------------------------------------scalar-----------------------------------------
+def flip_vertical(x):
+    """
+    上下翻转，即交换字节的顺序
+    """
+    x = ((x >> 8) & K8) | ((x & K8) << 8)
+    x = ((x >> 16) & K16) | ((x & K16) << 16)
+    return ((x >> 32) | (x << 32)) & MASK
+
+
+def mirror_horizontal(x):
+    """
+    左右翻转，即每个字节内部的比特倒序
+    """
+    x = ((x >> 1) & K1) | ((x & K1) << 1)
+    x = ((x >> 2) & K2) | ((x & K2) << 2)
+    return ((x >> 4) & K4) | ((x & K4) << 4)
+
+
+def flip_diagonal(x):
+    """
+    沿主对角线(左上到右下)翻转，即转置。使用三次delta swap
+    """
+    t = D4 & (x ^ (x << 28))
+    x ^= t ^ (t >> 28)
+    t = D2 & (x ^ (x << 14))
+    x ^= t ^ (t >> 14)
+    t = D1 & (x ^ (x << 7))
+    x ^= t ^ (t >> 7)
+    return x
+
+
+def transform(x, t):
+    """
+    对64位棋盘做第t种变换
+    """
+    if t & 4:
+        x = flip_diagonal(x)
+    if t & 2:
+        x = flip_vertical(x)
+    if t & 1:
+        x = mirror_horizontal(x)
+    return x
+
+
+# --------------------------------------batch-----------------------------------------
+def flip_vertical_batch(x):
+    x = ((x >> S[8]) & U['K8']) | ((x & U['K8']) << S[8])
+    x = ((x >> S[16]) & U['K16']) | ((x & U['K16']) << S[16])
+    return (x >> S[32]) | (x << S[32])
+
+
+def mirror_horizontal_batch(x):
+    x = ((x >> S[1]) & U['K1']) | ((x & U['K1']) << S[1])
+    x = ((x >> S[2]) & U['K2']) | ((x & U['K2']) << S[2])
+    return ((x >> S[4]) & U['K4']) | ((x & U['K4']) << S[4])
+
+
+def flip_diagonal_batch(x):
+    t = U['D4'] & (x ^ (x << S[28]))
+    x = x ^ t ^ (t >> S[28])
+    t = U['D2'] & (x ^ (x << S[14]))
+    x = x ^ t ^ (t >> S[14])
+    t = U['D1'] & (x ^ (x << S[7]))
+    return x ^ t ^ (t >> S[7])
+
+
+def transform_batch(x, t):
+    """
+    对np.uint64数组中的每个棋盘做第t种变换
+    """
+    x = np.asarray(x, dtype=np.uint64)
+    if t & 4:
+        x = flip_diagonal_batch(x)
+    if t & 2:
+        x = flip_vertical_batch(x)
+    if t & 1:
+        x = mirror_horizontal_batch(x)
+    return x
+
+
+# --------------------------------------tables-----------------------------------------
+# SQUARE_MAP[t][sq]：第sq个位置经过第t种变换之后的位置
+SQUARE_MAP = [[transform(1 << sq, t).bit_length() - 1 for sq in range(64)] for t in range(NUM_TRANSFORMS)]
+# INVERSE[t]：第t种变换的逆变换
+INVERSE = [next(u for u in range(NUM_TRANSFORMS)
+                if all(SQUARE_MAP[u][SQUARE_MAP[t][sq]] == sq for sq in range(64)))
+           for t in range(NUM_TRANSFORMS)]
+SQUARE_MAP_ARRAY = np.array(SQUARE_MAP, dtype=np.int64)
+# GATHER[t][sq]：变换之后第sq个位置来自变换之前的哪个位置，用于棋盘数组的变换
+GATHER_ARRAY = SQUARE_MAP_ARRAY[INVERSE]
+
+
+# --------------------------------------public-----------------------------------------
+def canonical(black, white):
+    """
+    8种对称局面中(black, white)最小的那个作为代表
+    :return key, t: key = black' << 64 | white'，t为变换编号
+    """
+    best_key = None
+    best_t = 0
+    for t in range(NUM_TRANSFORMS):
+        key = (transform(black, t) << 64) | transform(white, t)
+        if best_key is None or key < best_key:
+            best_key = key
+            best_t = t
+    return best_key, best_t
+
+
+def canonical_batch(black, white):
+    """
+    canonical的批量版本
+    :return black, white, t: 变换后的棋盘和变换编号，都是长度为N的数组
+    """
+    black = np.atleast_1d(np.asarray(black, dtype=np.uint64))
+    white = np.atleast_1d(np.asarray(white, dtype=np.uint64))
+    all_black = np.stack([transform_batch(black, t) for t in range(NUM_TRANSFORMS)])
+    all_white = np.stack([transform_batch(white, t) for t in range(NUM_TRANSFORMS)])
+    # 以black为第一关键字，white为第二关键字排序
+    t = np.lexsort((all_white, all_black), axis=0)[0]
+    index = np.arange(black.shape[0])
+    return all_black[t, index], all_white[t, index], t
+
+
+def canonical_move(move, t):
+    """
+    原局面中的落子位置move在第t种变换之后的位置
+    """
+    if move == PASS:
+        return PASS
+    return SQUARE_MAP[t][move]
+
+
+def original_move(move, t):
+    """
+    canonical_move的逆运算：变换后局面中的落子位置对应原局面中的位置
+    """
+    if move == PASS:
+        return PASS
+    return SQUARE_MAP[INVERSE[t]][move]
+
+
+def canonical_move_batch(moves, t):
+    """
+    canonical_move的批量版本，t可以是一个数也可以是与moves等长的数组
+    """
+    moves = np.asarray(moves)
+    return np.where(moves == PASS, PASS, SQUARE_MAP_ARRAY[t, np.maximum(moves, 0)])
+
+
+def transform_boards(boards, t):
+    """
+    对棋盘数组(..., 64)做第t种变换，可用于经验数据的增强，动作向量也可以用同样的方法变换
+    """
+    return np.take(boards, GATHER_ARRAY[t], axis=-1)
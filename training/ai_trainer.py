@@ -1,124 +1,283 @@
 from ai_v2_4train import AIV2
 from board import Board
 from reversi4train import Game
+from book4train import OpeningBook
+from evalcache4train import EvalCache
+from tournament4train import MatchCache, round_robin_pairs, random_pairs, swiss_pairs, kendall_tau
+import argparse
+import os
 import random
-import copy
 import json
+import numpy as np
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 GENE_BLOCK_SIZE = 5  # 基因的数量，即有多少个权重(一个评估函数需要一个权重)
 POPULATION = 100  # 种群内个体的数量
 SUPERIOR_NUM = 1  # 保留优胜种的数量，剩下的杂交
 EPOCH_SAVE = 5  # 多少代保存一次最优染色体
+TT_SIZE = 0  # 每个AI的置换表最多保存的结果数，0表示不使用。用来限制每个进程的内存。得分相同时选的位置可能不同，比赛结果会变
+BOOK_PATH = None  # book4train.py生成的开局库，None表示不使用
+EVAL_CACHE_SIZE = 0  # 一代中所有比赛共用的估值缓存最多保存的结果数，0表示不使用。内存约为200字节 * EVAL_CACHE_SIZE
+WORKERS = 1  # 计算适应度的进程数，1表示在本进程中串行比赛，None表示CPU核数。每个进程各有一个估值缓存
+CHUNK_SIZE = 50  # 每次交给一个进程的比赛场数
+DEPTH = 3  # 比赛中AIV2的搜索深度
+MATCH_CACHE_PATH = None  # 保存比赛结果的json文件，None表示只在内存中保存。修改TT_SIZE或BOOK_PATH之后原来的结果作废
+SCHEDULE = 'round_robin'  # 计算适应度的比赛安排：round_robin、swiss、random、benchmark
+SWISS_ROUNDS = 7  # 瑞士制的轮数，每轮POPULATION场
+K_OPPONENTS = 10  # random：每个染色体的对手数
+BENCHMARK_SIZE = 8  # benchmark：基准对手的个数
+BENCHMARK_SEED = 2019  # benchmark：基准对手由这个种子随机生成，每一代都相同
+SEED = None  # 选择、交叉、变异以及瑞士制、随机对手配对所用随机数生成器的种子，None表示每次运行不同
+MAX_MUTATIONS = 9  # 每个子染色体最多的突变点数，实际突变点数在[0, MAX_MUTATIONS]中均匀选取
 
 
-def generate_weight():
+def crossover(parents1, parents2, rng):
     """
-    随机产生染色体
-    :return chromosome = [12, 34, 255, 222, 250] etc.
+    整个群落同时单点交叉：子染色体的前node个基因来自父染色体，其余来自母染色体，node在[0, GENE_BLOCK_SIZE)中随机选取
+    :param parents1: 父染色体，(n, GENE_BLOCK_SIZE)的uint8数组
+    :param parents2: 母染色体，形状与parents1相同
+    :param rng: np.random.Generator
+    :return posterity: 子染色体
     """
-    chromosome = []
-    for i in range(GENE_BLOCK_SIZE):
-        chromosome.append(random.randint(0, 255))
-    return chromosome
+    node = rng.integers(0, parents1.shape[1], size=len(parents1))
+    from_father = np.arange(parents1.shape[1]) < node[:, None]
+    return np.where(from_father, parents1, parents2)
 
 
-def int2bit(old_chromosome):
+def mutation(group, rng):
     """
-    将十进制数转为二进制数
-    chromosome = [12, 34, 255, 222, 250]
-    1. 使用{:08b}格式符直接将整数转为二进制字符串
-        chromosome = [['00001100'], ..]
-    2. 使用list将字符串切割成字符
-        chromosome = [['0', '0', '0', '0', '1', '1', '0', '0'], ..]
-    3. 使用map(int, list)将字符转为整数
-        chromosome = [[0, 0, 0, 0, 1, 1, 0, 0], ..]
+    整个群落同时变异：每个染色体随机选[0, MAX_MUTATIONS]个突变点(可重复，重复两次等于没有突变)，把对应的位取反。
+    第k个突变位置在第k // 8个基因中，从高位数起第k % 8位
+    :param group: (n, GENE_BLOCK_SIZE)的uint8数组
+    :param rng: np.random.Generator
+    :return new_group: 变异后的群落，不修改group
     """
-    new_chromosome = []
-    for part_chromosome in old_chromosome:
-        new_chromosome.append(list(map(int, list('{:08b}'.format(part_chromosome)))))
-    return new_chromosome
+    n, genes = group.shape
+    mutation_num = rng.integers(0, MAX_MUTATIONS + 1, size=n)  # 突变点的个数
+    mutation_pos = rng.integers(0, genes * 8, size=(n, MAX_MUTATIONS))  # 随机选择突变位置
+    rows, cols = np.nonzero(np.arange(MAX_MUTATIONS) < mutation_num[:, None])
+    pos = mutation_pos[rows, cols]
+    new_group = group.copy()
+    np.bitwise_xor.at(new_group, (rows, pos // 8), (1 << (7 - pos % 8)).astype(np.uint8))  # 取反
+    return new_group
 
 
-def bit2int(old_chromosome):
+def initial_population(rng):
     """
-    将二进制数转化为在[0, 255]范围内的整数
-    chromosome = [[1, 0, 1, 0, 1, 1, 1, 1], [..], [..],..]
-    1. 为了便于操作，使用map(str, list)先将每个基因中的每一个位变成字符
-        chromosome = [['1', '0', '1', '0', '1', '1', '1', '1'], [..], [..],..]
-    2. 使用str.join函数将单个基因内的8个字符拼接在一起
-        chromosome = [['10101111'], [..], ..]
-    3. 使用int(x, base=2)函数将字符串由2进制转为10进制。注意base=2指明x是二进制形式
-        chromosome = [175, ...]
+    初始化种群
+    :param rng: np.random.Generator
+    :return group:种群，(POPULATION, GENE_BLOCK_SIZE)的uint8数组，每个染色体随机生成
     """
-    new_chromosome = list(map(lambda x: map(str, x), old_chromosome))
-    return list(map(lambda x: int("".join(x), base=2), new_chromosome))
+    return rng.integers(0, 256, size=(POPULATION, GENE_BLOCK_SIZE), dtype=np.uint8)
+
 
+# --------------------------------------worker-----------------------------------------
+_book = None  # 每个进程中的开局库
+_eval_cache = None  # 每个进程中的估值缓存，同一代的比赛共用
+_tt_size = 0
+_depth = DEPTH
 
-def crossover(chromosome1, chromosome2):
+
+def _init_worker(book_path, eval_cache_size, tt_size, depth):
     """
-    染色体单点交叉
-    :param chromosome1: 父染色体
-    :param chromosome2: 母染色体
-    :return posterity_chromosome: 子染色体
+    配置通过参数传入，子进程不是fork出来的时候也能拿到修改过的BOOK_PATH、DEPTH等
     """
-    node = random.randint(0, 4)
-    return chromosome1[:node] + chromosome2[node:]
+    global _book, _eval_cache, _tt_size, _depth
+    _book = OpeningBook.load(book_path) if book_path else None
+    _eval_cache = EvalCache(eval_cache_size) if eval_cache_size else None
+    _tt_size = tt_size
+    _depth = depth
 
 
-def mutation(chromosome):
+def _play_matches(matches):
     """
-    染色体变异
-    :param chromosome:
-    :return:
+    :param matches: [(k, chromosome1, chromosome2), ...]，chromosome1执黑
+    :return scores, hits, misses: [(k, chromosome1的得分), ...]，以及这些比赛中估值缓存的命中和未命中次数
     """
-    mutation_num = int(random.random() * 10)    # 突变点的个数
-    mutation_pos = random.choices([_ for _ in range(GENE_BLOCK_SIZE * 8)], k=mutation_num)  # 随机选择突变位置
-    new_chromosome = copy.deepcopy(chromosome)
-    for pos in mutation_pos:
-        row = pos // 8  # 找到对应基因块
-        col = pos % 8  # 从基因块中找到基因
-        new_chromosome[row][col] ^= 1  # 取反
-    return new_chromosome
+    hits, misses = (_eval_cache.hits, _eval_cache.misses) if _eval_cache is not None else (0, 0)
+    scores = []
+    for k, chromosome1, chromosome2 in matches:
+        # 正在初始化棋盘
+        board = Board()
+        # 正在往AI体内插入染色体，注意归一化染色体
+        ai_v1 = AIV2(board, list(map(lambda x: x / 255, chromosome1)), _depth, "ai_v1", _tt_size, book=_book,
+                     eval_cache=_eval_cache)
+        ai_v2 = AIV2(board, list(map(lambda x: x / 255, chromosome2)), _depth, "ai_v2", _tt_size, book=_book,
+                     eval_cache=_eval_cache)
+        # 双方开始比赛
+        game = Game(board, ai_v1, ai_v2)
+        scores.append((k, game.run(True)))
+    if _eval_cache is not None:
+        hits, misses = _eval_cache.hits - hits, _eval_cache.misses - misses
+    return scores, hits, misses
+
+
+# --------------------------------------fitness-----------------------------------------
+_match_cache = None  # 整个训练过程中的比赛结果
+
+
+def get_match_cache():
+    global _match_cache
+    if _match_cache is None:
+        _match_cache = MatchCache(MATCH_CACHE_PATH, {'tt_size': TT_SIZE, 'book': BOOK_PATH})
+    return _match_cache
 
 
-def initial_population():
+class MatchWorkers:
+    def __init__(self, workers=WORKERS):
+        """
+        下棋的进程。一代开始时创建一次，这一代的各轮比赛共用，每个进程中的估值缓存在这一代中一直保留
+        :param workers: 进程数，1表示在本进程中下棋，None表示CPU核数
+        """
+        self.workers = workers or os.cpu_count()
+        settings = (BOOK_PATH, EVAL_CACHE_SIZE, TT_SIZE, DEPTH)
+        if self.workers == 1:
+            _init_worker(*settings)
+            self.pool = None
+        else:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=settings)
+
+    # --------------------------------------public-----------------------------------------
+    def run(self, chunks):
+        """
+        :return results: 依次返回每块比赛的_play_matches结果(不一定按chunks的顺序)
+        """
+        if self.pool is None:
+            for chunk in chunks:
+                yield _play_matches(chunk)
+        else:
+            for future in as_completed([self.pool.submit(_play_matches, chunk) for chunk in chunks]):
+                yield future.result()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def play_matches(matches, workers=WORKERS, runner=None):
     """
-    初始化种群
-    :return group:种群，里面的每个染色体随机生成
-    """
-    group = []
-    for i in range(POPULATION):
-        group.append(generate_weight())
-    return group
-
-
-def count_fitness(group):
-    # 每个染色体的适应度，下标与group中的一一对应
-    fitness = [0] * POPULATION
-
-    for i in range(len(group)):  # 共2 * POPULATION * (POPULATION - 1)场比赛
-        for j in range(len(group)):
-            if i == j:
-                continue
-            # 正在初始化棋盘
-            board = Board()
-            # 寻找染色体
-            chromosome1 = group[i]
-            chromosome2 = group[j]
-            # 正在往AI体内插入染色体，注意归一化染色体
-            ai_v1 = AIV2(board, list(map(lambda x: x / 255, chromosome1)), 3, "ai_v1")
-            ai_v2 = AIV2(board, list(map(lambda x: x / 255, chromosome2)), 3, "ai_v2")
-            # 双方开始比赛
-            game = Game(board, ai_v1, ai_v2)
-            score = game.run(True)
-            # 记录比分
-            fitness[i] += score
-            fitness[j] -= score
-            # print("第{}号染色体的适应度fitness:".format(i + 1), fitness[i])
+    比赛结果先查缓存，其余的按CHUNK_SIZE分块交给workers个进程。相同的比赛只下一次
+    :param matches: [(chromosome1, chromosome2), ...]，chromosome1执黑
+    :param workers: 进程数，1表示串行，None表示CPU核数
+    :param runner: MatchWorkers，None表示这次调用单独创建(与同一代的其他比赛不共用估值缓存)
+    :return scores: 每场比赛chromosome1的得分，1胜，-1负，0平
+    """
+    if runner is None:
+        with MatchWorkers(workers) as runner:
+            return play_matches(matches, workers, runner)
+    cache = get_match_cache()
+    keys = [MatchCache.key(chromosome1, chromosome2, True, DEPTH) for chromosome1, chromosome2 in matches]
+    scores = [cache.get(key) for key in keys]
+    todo = {}  # 缓存中没有的比赛 -> 第一次出现的下标
+    for k, score in enumerate(scores):
+        if score is None:
+            todo.setdefault(keys[k], k)
+    todo = [(k, matches[k][0], matches[k][1]) for k in todo.values()]
+    chunks = [todo[k:k + CHUNK_SIZE] for k in range(0, len(todo), CHUNK_SIZE)]
+    start = time.perf_counter()
+    hits = misses = 0
+    for chunk_scores, chunk_hits, chunk_misses in runner.run(chunks):
+        for k, score in chunk_scores:
+            cache.put(keys[k], score)
+        hits += chunk_hits
+        misses += chunk_misses
+
+    seconds = time.perf_counter() - start
+    print("{} matches, {} games played, {} workers, {:.1f}s, {:.2f} games/s".format(
+        len(matches), len(todo), runner.workers, seconds, len(todo) / seconds if seconds > 0 else 0.0))
+    if EVAL_CACHE_SIZE and todo:
+        print("eval cache: hits {}, misses {}, hit rate {:.1%}".format(
+            hits, misses, hits / (hits + misses) if hits + misses else 0.0))
+    return [cache.results[key] for key in keys]
+
+
+def schedule_fitness(group, schedule=SCHEDULE, workers=WORKERS, rng=None):
+    """
+    按schedule安排比赛，适应度为每场比赛的得分之和
+    :param schedule: round_robin：全循环赛，POPULATION * (POPULATION - 1)场；
+        swiss：SWISS_ROUNDS轮瑞士制；random：每个染色体与K_OPPONENTS个随机对手比赛；
+        benchmark：每个染色体与BENCHMARK_SIZE个固定的基准对手比赛
+    :param rng: 瑞士制、随机对手配对所用的random.Random，None表示random.Random(SEED)
+    :return fitness, games: fitness与group一一对应，games为安排的比赛场数(相同的比赛只算一次)
+    """
+    n = len(group)
+    fitness = [0] * n
+    games = set()
+    rng = rng or random.Random(SEED)
+    if schedule == 'benchmark':
+        benchmark_rng = random.Random(BENCHMARK_SEED)
+        pool = [[benchmark_rng.randint(0, 255) for _ in range(GENE_BLOCK_SIZE)] for _ in range(BENCHMARK_SIZE)]
+        matches = [(chromosome, b) for chromosome in group for b in pool] + \
+                  [(b, chromosome) for chromosome in group for b in pool]
+        scores = play_matches(matches, workers)
+        for k, score in enumerate(scores[:n * BENCHMARK_SIZE]):
+            fitness[k // BENCHMARK_SIZE] += score
+        for k, score in enumerate(scores[n * BENCHMARK_SIZE:]):
+            fitness[k // BENCHMARK_SIZE] -= score
+        games.update((tuple(c1), tuple(c2)) for c1, c2 in matches)
+        return fitness, len(games)
+
+    if schedule == 'round_robin':
+        rounds = [round_robin_pairs(n)]
+    elif schedule == 'random':
+        rounds = [random_pairs(n, K_OPPONENTS, rng)]
+    elif schedule == 'swiss':
+        rounds = [None] * SWISS_ROUNDS  # 每一轮的配对取决于前一轮的结果
+        played = set()
+    else:
+        raise ValueError("unknown schedule {}".format(schedule))
+    with MatchWorkers(workers) as runner:  # 各轮比赛共用进程和估值缓存
+        for pairs in rounds:
+            if pairs is None:
+                pairs = swiss_pairs(fitness, played, rng)
+            scores = play_matches([(group[i], group[j]) for i, j in pairs], workers, runner)
+            for (i, j), score in zip(pairs, scores):
+                # 记录比分
+                fitness[i] += score
+                fitness[j] -= score
+            games.update((tuple(group[i]), tuple(group[j])) for i, j in pairs)
+    return fitness, len(games)
+
+
+def count_fitness(group, workers=WORKERS, schedule=SCHEDULE, rng=None):
+    """
+    :param workers: 进程数，1表示串行，None表示CPU核数
+    :param schedule: 比赛安排，见schedule_fitness
+    :param rng: 配对所用的random.Random，见schedule_fitness
+    :return group_fitness: [(chromosome, fitness), ...]，按适应度由小到大排序
+    """
+    fitness, _ = schedule_fitness(group, schedule, workers, rng)
+    cache = get_match_cache()
+    print(cache.report())
+    cache.save()
     group_fitness = list(zip(group, fitness))  # 将染色体与它的适应度配对，[(chromosome,fitness), ...]
     return sorted(group_fitness, key=lambda x: x[1])  # 根据fitness[?][0]，也就是适应度来排序
 
 
+def compare_schedules(group, workers=WORKERS, schedules=('swiss', 'random', 'benchmark')):
+    """
+    用各种比赛安排计算同一个群落的适应度，与全循环赛比较排名(Kendall tau)和比赛场数。
+    全循环赛的结果进入比赛缓存，瑞士制和随机对手不需要再下棋
+    :return results: {schedule: (tau, games)}
+    """
+    full, games = schedule_fitness(group, 'round_robin', workers)
+    results = {'round_robin': (1.0, games)}
+    for schedule in schedules:
+        fitness, games = schedule_fitness(group, schedule, workers, random.Random(0))
+        results[schedule] = (kendall_tau(full, fitness), games)
+    for schedule, (tau, games) in results.items():
+        print("{:12s} games {:6d}  kendall tau {:.3f}".format(schedule, games, tau))
+    get_match_cache().save()
+    return results
+
+
 def do_reproduction_operator(group_fitness):
     """
     选择/再生运算子
@@ -135,50 +294,61 @@ def do_reproduction_operator(group_fitness):
     return superior
 
 
-def do_crossover(group_fitness):
+def do_crossover(group_fitness, rng):
+    """
+    按适应度轮盘赌选出POPULATION - SUPERIOR_NUM对父母，单点交叉
+    :param group_fitness: 去掉了优胜种的群落，包括染色体和适应度
+    :param rng: np.random.Generator
+    :return new_group: (POPULATION - SUPERIOR_NUM, GENE_BLOCK_SIZE)的uint8数组
+    """
     group, fitness = zip(*group_fitness)  # 解除配对，将所有group_fitness[i][0]组成一个列表，group_fitness[i][1]同理
-    new_group = []
+    group = np.array(group, dtype=np.uint8)
     # -----------------------------------交叉运算-----------------------------------------
-    min_v = abs(min(fitness)) + 1
-    fitness = [x + min_v for x in fitness]  # 如果fitness全为0或有负数，random.choices会出错，故将所有值+|最小值|+1
-    for i in range(POPULATION - SUPERIOR_NUM):
-        # 将适应度频率作为权重进行加权随机选择。权重越大越容易被选到。每次选出2个染色体。
-        chromosomes = random.choices(group, weights=fitness, k=2)
-        new_chromosome = crossover(chromosomes[0], chromosomes[1])
-        new_group.append(new_chromosome)
+    fitness = np.array(fitness, dtype=np.float64)
+    fitness += abs(fitness.min()) + 1  # 如果fitness全为0或有负数，无法作为概率，故将所有值+|最小值|+1
+    # 将适应度频率作为权重进行加权随机选择。权重越大越容易被选到。每个子染色体选出2个染色体。
+    parents = rng.choice(len(group), size=(POPULATION - SUPERIOR_NUM, 2), p=fitness / fitness.sum())
+    new_group = crossover(group[parents[:, 0]], group[parents[:, 1]], rng)
     # -----------------------------------交叉运算-----------------------------------------
     return new_group
 
 
-def do_mutation(group, superior):
+def do_mutation(group, superior, rng):
     """
     :param group: 经过交叉后的群落
     :param superior: 选择运算得到的优秀染色体
-    :return: 经过突变后的群落
+    :param rng: np.random.Generator
+    :return: 经过突变后的群落，(POPULATION, GENE_BLOCK_SIZE)的uint8数组，优秀染色体在最前面
     """
-    # 转为二进制数
-    bit_group = list(map(int2bit, group))
-    # 突变
-    mutation_group = list(map(mutation, bit_group))
-    # 转回十进制数
-    int_group = list(map(bit2int, mutation_group))
-    return superior + int_group
+    return np.concatenate([np.array(superior, dtype=np.uint8).reshape(-1, GENE_BLOCK_SIZE), mutation(group, rng)])
 
 
 def main():
+    parser = argparse.ArgumentParser(description="train AIV2 weights with a genetic algorithm")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="进程数，0表示CPU核数")
+    parser.add_argument('--schedule', default=SCHEDULE, choices=('round_robin', 'swiss', 'random', 'benchmark'))
+    parser.add_argument('--compare', action='store_true', help="只比较各种比赛安排与全循环赛的排名，不训练")
+    args = parser.parse_args()
+    workers = args.workers or None
+
     epoch = 1
-    group = initial_population()  # 群落
+    rng = np.random.default_rng(SEED)
+    pairing_rng = random.Random(SEED)  # 瑞士制、随机对手的配对
+    group = initial_population(rng)  # 群落
+    if args.compare:
+        compare_schedules(group.tolist(), workers)
+        return
     while True:
         print("------------------EPOCH {}----------------------".format(epoch))
-        group_fitness = count_fitness(group)  # 群落中每个个体的适应度
+        group_fitness = count_fitness(group.tolist(), workers, args.schedule, pairing_rng)  # 群落中每个个体的适应度
         loss = group_fitness[-1][1] - group_fitness[0][1]
         print("highest score:", group_fitness[-1][1], ", lowest score:", group_fitness[0][1])
         print("loss:", loss)
         if loss < 5 or epoch > 10:
             break
         superior = do_reproduction_operator(group_fitness)
-        crossover_group = do_crossover(group_fitness)
-        group = do_mutation(crossover_group, superior)
+        crossover_group = do_crossover(group_fitness, rng)
+        group = do_mutation(crossover_group, superior, rng)
         epoch += 1
         if epoch % EPOCH_SAVE == 0:
             with open("save/{}.json".format(epoch), "w") as f:
@@ -1,24 +1,89 @@
+import time
 import numpy as np
 from const import *
-import copy
+from endgame4train import EndgameSolver
+from zobrist4train import TranspositionTable, board_hash, move_hash, position_key, EXACT, LOWER, UPPER, NO_MOVE
+
+# 第r行第c列的编号为r * 8 + c，与zobrist4train相同
+# 四条边：第1行、第6行、第2列、第6列(与__eval_stable_p中切出的边相同)。EDGE_CELLS[i]为第i条边的6个位置
+EDGE_CELLS = [
+    [1 * 8 + c for c in range(1, 7)],
+    [6 * 8 + c for c in range(1, 7)],
+    [r * 8 + 2 for r in range(1, 7)],
+    [r * 8 + 6 for r in range(1, 7)],
+]
+# EDGE_OF[index]：位置index所在的边及是否计入稳定点(边的两端不计入)，[(edge, counted), ...]
+EDGE_OF = [[(e, cells.index(index) in range(1, 5)) for e, cells in enumerate(EDGE_CELLS) if index in cells]
+           for index in range(64)]
+CORNER_CELLS = (1 * 8 + 1, 1 * 8 + 6, 6 * 8 + 1, 6 * 8 + 6)
+
+MAX_PLY = 64  # 杀手表的大小，6*6棋盘的搜索不会超过这个深度
+
+
+class SearchAbort(Exception):
+    """
+    超出时间或结点数预算时中止搜索
+    """
+    pass
 
 
 class AIV2:
-    def __init__(self, board, weights=(0.5, 0.5, 0.5, 0.5, 0.5), depth=4, name='ai'):
+    def __init__(self, board, weights=(0.5, 0.5, 0.5, 0.5, 0.5), depth=4, name='ai', tt_size=0,
+                 time_limit=None, node_limit=None, endgame_empties=0, parallel=None,
+                 book=None, eval_cache=None):
+        """
+        :param depth: 搜索深度。设置了time_limit或node_limit时不使用，改为迭代加深直到预算用完或搜到终局
+        :param tt_size: 置换表最多保存的结果数，0表示不使用置换表。遗传算法中每个AI各有一张表，用它限制内存。
+            深度不小于当前深度的结果都会用来剪枝，根结点的得分与不使用置换表时相同，但得分相同的位置可能选得不同，整盘棋可能不同
+        :param time_limit: 每步棋的思考时间(秒)，None表示不限制
+        :param node_limit: 每步棋搜索的结点数，None表示不限制
+        :param endgame_empties: 空位数不超过这个值时改用EndgameSolver搜索到终局，0表示不使用
+        :param parallel: parallel4train.ParallelRootSearch，固定深度搜索时在多个进程中并行搜索根结点，None表示串行
+        :param book: book4train.OpeningBook，思考之前先查开局库，None表示不使用
+        :param eval_cache: evalcache4train.EvalCache，缓存叶子结点的估值，可以由多个AI共用，None表示不使用
+        """
         self.board = board  # 棋盘
         self.pos_weight = np.array([
-            ['┌', '─', '─', '─', '─', '─', '─', '┐'],
-            ['│', 20, 5, 5, 5, 5, 20, '│'],
-            ['│', 5, -10, -3, -3, -10, 5, '│'],
-            ['│', 5, -3, 3, 3, -3, 5, '│'],
-            ['│', 5, -3, 3, 3, -3, 5, '│'],
-            ['│', 5, -10, -3, -3, -10, 5, '│'],
-            ['│', 20, 5, 5, 5, 5, 20, '│'],
-            ['└', '─', '─', '─', '─', '─', '─', '┘']
-        ])  # 棋盘权重表，为了跟棋盘对应，这里加上了边框
+            [0, 0, 0, 0, 0, 0, 0, 0],
+            [0, 20, 5, 5, 5, 5, 20, 0],
+            [0, 5, -10, -3, -3, -10, 5, 0],
+            [0, 5, -3, 3, 3, -3, 5, 0],
+            [0, 5, -3, 3, 3, -3, 5, 0],
+            [0, 5, -10, -3, -3, -10, 5, 0],
+            [0, 20, 5, 5, 5, 5, 20, 0],
+            [0, 0, 0, 0, 0, 0, 0, 0]
+        ])  # 棋盘权重表，为了跟棋盘对应，这里加上了边框(权重为0)
+        self.__weight_list = self.pos_weight.ravel().tolist()
         self.name = name
         self.weights = weights
         self.depth = depth
+        self.tt_size = tt_size
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+        self.__hash = 0  # 当前棋盘的Zobrist哈希值，仅在使用置换表或估值缓存时维护
+        # 估价函数用到的统计量，搜索开始时从棋盘计算，之后随落子和回溯增量更新
+        self.__discs = {BLACK: 0, WHITE: 0}  # 棋子数
+        self.__pos_score = {BLACK: 0, WHITE: 0}  # 权重表得分
+        self.__corners = {BLACK: 0, WHITE: 0}  # 四个角上的棋子数
+        self.__edge_blank = [0, 0, 0, 0]  # 每条边上的空位数
+        self.__edge_discs = {BLACK: [0, 0, 0, 0], WHITE: [0, 0, 0, 0]}  # 每条边上计入稳定点的棋子数
+        # 迭代加深
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.stats = {'depth': 0, 'nodes': 0, 'seconds': 0.0, 'branching': 0.0}  # 上一步棋的搜索统计
+        self.__nodes = 0
+        self.__deadline = None  # 超过这个时间(time.perf_counter)中止搜索
+        self.__max_nodes = None
+        self.__ordering = False  # 是否对可落子位置排序，只在迭代加深时使用，固定深度时保持原来的顺序
+        self.__root_depth = 0
+        self.__pv = [[] for _ in range(MAX_PLY + 1)]  # 三角形主要变例表，__pv[ply]为从第ply层开始的主要变例
+        self.__prev_pv = []  # 上一次迭代的主要变例
+        self.__killers = [[NO_MOVE, NO_MOVE] for _ in range(MAX_PLY)]  # 每层最近两次引起剪枝的位置
+        self.__history = {True: [0] * 64, False: [0] * 64}  # 历史表，引起剪枝的位置按深度平方累加
+        self.endgame_empties = endgame_empties
+        self.parallel = parallel
+        self.book = book
+        self.eval_cache = eval_cache
+        self.__weights_id = 0  # 权重在估值缓存中的编号
 
     # ---------------------------------public-----------------------------------
     def think(self, chessman_color, oppo_name):
@@ -30,8 +95,32 @@ class AIV2:
         """
         ok = self.board.find_position(chessman_color)  # 判断自己是否有位置可以落子
         if ok:  # 有位置下棋
-            # alpha_beta剪枝
-            _, pos = self.alpha_beta_minimax(chessman_color, self.depth, parity=self.board.parity)
+            start = time.perf_counter()
+            self.__nodes = 0
+            empties = int(np.count_nonzero(self.board.board == BLANK))
+            pos = None if self.book is None else self.book.lookup(self.board.board, chessman_color)
+            if pos is not None:
+                # 开局库中的局面
+                depth = 0
+            elif empties <= self.endgame_empties:
+                # 残局精确求解
+                solver = EndgameSolver()
+                _, pos = solver.think(self.board, chessman_color)
+                self.__nodes = solver.nodes
+                depth = empties
+            elif self.time_limit is None and self.node_limit is None:
+                # alpha_beta剪枝
+                if self.parallel is not None:
+                    _, pos = self.parallel.search(self, chessman_color, self.depth, self.board.parity)
+                else:
+                    _, pos = self.alpha_beta_minimax(chessman_color, self.depth, parity=self.board.parity)
+                depth = self.depth
+            else:
+                pos, depth = self.__iterative_deepening(chessman_color, start)
+            seconds = time.perf_counter() - start
+            # 有效分支因子：结点数 = branching ^ depth
+            self.stats = {'depth': depth, 'nodes': self.__nodes, 'seconds': seconds,
+                          'branching': self.__nodes ** (1 / depth) if depth else 0.0}
 
             # AI下棋
             self.__chess(pos, chessman_color)
@@ -49,51 +138,192 @@ class AIV2:
         :param oppo_score:初始化为正无穷，因为对手是min结点，它的值越小越好
         :return score, pos:返回得分最高的落子位置
         """
+        if self.tt is not None:
+            self.tt.new_search()
+        if self.tt is not None or self.eval_cache is not None:
+            self.__hash = board_hash(self.board.board)
+        if self.eval_cache is not None:
+            self.__weights_id = self.eval_cache.weights_id(self.weights)
+        self.__reset_eval()
+        self.__root_depth = depth
+        return self.__alpha_beta(chessman_color, depth, parity, my_score, oppo_score)
+
+    def evaluate(self, chessman_color, valid_pos, parity):
+        """
+        多种估计函数的综合。先从当前棋盘重新计算统计量，可以在搜索之外直接调用
+        :param chessman_color:
+        :param valid_pos:
+        :param parity:
+        :return:
+        """
+        self.__reset_eval()
+        return self.__evaluate(chessman_color, valid_pos, parity)
+
+    # ---------------------------------private-----------------------------------
+    def __evaluate(self, chessman_color, valid_pos, parity):
+        """
+        与evaluate相同，但使用搜索中增量更新的统计量，只能在__alpha_beta中调用
+        """
+        return \
+            self.weights[0] * self.__eval_parity(chessman_color, parity) + \
+            self.weights[1] * self.__eval_stable_p(chessman_color) + \
+            self.weights[2] * self.__eval_movers(valid_pos) + \
+            self.weights[3] * self.__eval_chessman_num(chessman_color) + \
+            self.weights[4] * self.__eval_overall_pos(chessman_color)
+
+    def __iterative_deepening(self, chessman_color, start):
+        """
+        迭代加深：依次搜索1, 2, 3...层，用上一次迭代的主要变例、杀手表和历史表排序，预算用完时返回最后一次完整搜索的结果
+        :param start: 开始思考的时间
+        :return pos, depth: 最佳位置和完成的深度
+        """
+        board = self.board.board.copy()
+        xboard = self.board.xboard.copy()
+        max_depth = int(np.count_nonzero(board == BLANK))
+        # 历史表随着棋局推进逐渐衰减，杀手表的层数每步棋都会变化，清空
+        for color in (True, False):
+            self.__history[color] = [h // 2 for h in self.__history[color]]
+        for killer in self.__killers:
+            killer[0] = killer[1] = NO_MOVE
+        self.__prev_pv = []
+        self.__ordering = True
+
+        pos = self.__get_valid_pos(chessman_color)[0]
+        depth = 0
+        try:
+            for d in range(1, max_depth + 1):
+                # 第一层一定搜完，保证至少有一个经过搜索的结果
+                self.__deadline = None if d == 1 or self.time_limit is None else start + self.time_limit
+                self.__max_nodes = None if d == 1 else self.node_limit
+                _, pos = self.alpha_beta_minimax(chessman_color, d, parity=self.board.parity)
+                self.__prev_pv = self.__pv[0][:]
+                depth = d
+                if self.time_limit is not None and time.perf_counter() - start >= self.time_limit:
+                    break
+        except SearchAbort:
+            # 中止时棋盘停在搜索中途，恢复
+            self.board.board = board
+            self.board.xboard = xboard
+        finally:
+            self.__deadline = None
+            self.__max_nodes = None
+            self.__ordering = False
+        return pos, depth
+
+    def __order(self, valid_pos, ply, chessman_color, tt_move):
+        """
+        可落子位置的顺序：上一次迭代的主要变例、置换表中的最佳位置、杀手位置，其余按历史表得分由高到低
+        """
+        pv_move = self.__prev_pv[ply] if ply < len(self.__prev_pv) else NO_MOVE
+        killers = self.__killers[ply]
+        history = self.__history[chessman_color]
+        keys = []
+        for r, c in valid_pos:
+            move = r * 8 + c
+            if move == pv_move:
+                keys.append(-4 << 32)
+            elif move == tt_move:
+                keys.append(-3 << 32)
+            elif move == killers[0]:
+                keys.append(-2 << 32)
+            elif move == killers[1]:
+                keys.append(-1 << 32)
+            else:
+                keys.append(-history[move])
+        return valid_pos[np.argsort(keys, kind='stable')]
+
+    def __alpha_beta(self, chessman_color, depth, parity, my_score, oppo_score, probed=False):
+        """
+        alpha_beta_minimax的递归部分，参数和返回值相同
+        :param probed: 父结点已经查过估值缓存(没有命中)
+        """
+        self.__nodes += 1
+        if self.__deadline is not None and time.perf_counter() > self.__deadline:
+            raise SearchAbort()
+        if self.__max_nodes is not None and self.__nodes > self.__max_nodes:
+            raise SearchAbort()
+        ply = self.__root_depth - depth
+        self.__pv[ply] = []
         best_pos = None
         best_score = my_score
         valid_pos = self.__get_valid_pos(chessman_color)
 
         # 最多向前看depth步，如果depth=0说明已经看到了"未来的"情况了，回溯
         if depth == 0:  # 到达伪叶子结点，计算得分，回溯
-            return self.evaluate(chessman_color, valid_pos, parity), best_pos
+            if self.eval_cache is None:
+                return self.__evaluate(chessman_color, valid_pos, parity), best_pos
+            cache_key = (self.__hash, chessman_color, parity, self.__weights_id)
+            score = None if probed else self.eval_cache.get(cache_key)
+            if score is None:
+                score = self.__evaluate(chessman_color, valid_pos, parity)
+                self.eval_cache.put(cache_key, score)
+            return score, best_pos
+
+        # 查置换表：深度足够的结果可以直接剪枝，否则用其中的最佳位置排序
+        key = None
+        tt_move = NO_MOVE
+        if self.tt is not None:
+            key = position_key(self.__hash, chessman_color, parity)
+            entry = self.tt.probe(key)
+            if entry is not None:
+                score, bound, tt_depth, move = entry
+                if tt_depth >= depth:
+                    pos = None if move == NO_MOVE else np.array([move // 8, move % 8])
+                    if bound == EXACT:
+                        return (score, pos) if score > my_score else (my_score, None)
+                    if bound == LOWER and score > oppo_score:
+                        return score, pos
+                    if bound == UPPER and score <= my_score:
+                        return my_score, None
+                tt_move = move
+                if move != NO_MOVE and len(valid_pos) > 1 and not self.__ordering:
+                    first = np.flatnonzero(valid_pos[:, 0] * 8 + valid_pos[:, 1] == move)
+                    if len(first) and first[0]:
+                        valid_pos = valid_pos[np.r_[first[0], 0:first[0], first[0] + 1:len(valid_pos)]]
+
+        if self.__ordering and len(valid_pos) > 1:
+            valid_pos = self.__order(valid_pos, ply, chessman_color, tt_move)
 
         # 处于中间结点，继续下棋
         if len(valid_pos) == 0:  # 如果无位置可落子，轮到对方下棋
-            # 备份，供下面回溯用
-            board = self.board.board
-            xboard = self.board.xboard
-            self.board.board = copy.deepcopy(self.board.board)
-            self.board.xboard = copy.deepcopy(self.board.xboard)
             # 使用minmax，模拟对手，此时到对方回合
             self.board.find_position(not chessman_color)  # 对方正在判断是否有位置可以落子
-            score, _ = self.alpha_beta_minimax(not chessman_color, depth - 1, parity + 1, -oppo_score,
-                                               -best_score)  # 对方也使用minmax策略
-            # 使用了递归，需要回溯
-            self.board.board = board
-            self.board.xboard = xboard
+            score, _ = self.__alpha_beta(not chessman_color, depth - 1, parity + 1, -oppo_score,
+                                         -best_score)  # 对方也使用minmax策略
             if -score > best_score:
                 best_score = -score
 
         # 遍历所有可落子的位置，找到得分最高的情况
+        h = self.__hash
+        hashing = self.tt is not None or self.eval_cache is not None
+        leaf_cache = depth == 1 and self.eval_cache is not None  # 子结点是叶子，落子之后先查估值缓存
         for pos in valid_pos:
-            # 备份，供下面回溯用
-            board = self.board.board
-            xboard = self.board.xboard
-            self.board.board = copy.deepcopy(self.board.board)
-            self.board.xboard = copy.deepcopy(self.board.xboard)
-            # 下棋
-            self.__chess(pos, chessman_color)
-            # 使用minmax，模拟对手，此时到对方回合
-            self.board.find_position(not chessman_color)  # 对方正在判断是否有位置可以落子
-            score, _ = self.alpha_beta_minimax(not chessman_color, depth - 1, parity + 1, -oppo_score,
-                                               -best_score)  # 对方也使用minmax策略
+            # 下棋，记录被反转的棋子，供下面回溯用
+            flipped = self.__chess(pos, chessman_color)
+            self.__update_eval(pos, flipped, chessman_color, 1)
+            if hashing:
+                self.__hash = move_hash(h, pos, flipped, chessman_color)
+            # 子结点是叶子并且估值已在缓存中时，不必再标记对方的可落子位置
+            score = None
+            if leaf_cache:
+                score = self.eval_cache.get((self.__hash, not chessman_color, parity + 1, self.__weights_id))
+            if score is not None:
+                self.__nodes += 1
+                self.__pv[ply + 1] = []
+            else:
+                # 使用minmax，模拟对手，此时到对方回合
+                self.board.find_position(not chessman_color)  # 对方正在判断是否有位置可以落子
+                score, _ = self.__alpha_beta(not chessman_color, depth - 1, parity + 1, -oppo_score,
+                                             -best_score, leaf_cache)  # 对方也使用minmax策略
             # 使用了递归，需要回溯
-            self.board.board = board
-            self.board.xboard = xboard
+            self.board.undo_color(pos, flipped, chessman_color)
+            self.__update_eval(pos, flipped, chessman_color, -1)
+            self.__hash = h
             # minimax
             if -score > best_score:
                 best_score = -score
                 best_pos = pos
+                self.__pv[ply] = [pos[0] * 8 + pos[1]] + self.__pv[ply + 1]
             """
                 剪枝。注意oppo_score是祖宗节点中对手(min)的得分。刚开始初始化为无穷。假设我们已经探索了一些结点
             使得oppo_score有值。这时，如果自己的得分best_score大于对手的得分(oppo_score)，显然对手不会采纳自己
@@ -103,43 +333,89 @@ class AIV2:
             score1。因此探索后续子节点做了无用功。剪枝。
             """
             if best_score > oppo_score:
+                if self.__ordering:
+                    self.__update_killer(ply, pos[0] * 8 + pos[1], chessman_color, depth)
                 break
-        return best_score, best_pos
+        # 子结点覆盖了xboard上的标记，回溯时恢复本结点的标记
+        self.board.mark_positions(valid_pos, chessman_color)
 
-    def evaluate(self, chessman_color, valid_pos, parity):
-        """
-        多种估计函数的综合
-        :param chessman_color:
-        :param valid_pos:
-        :param parity:
-        :return:
-        """
-        return \
-            self.weights[0] * self.__eval_parity(chessman_color, parity) + \
-            self.weights[1] * self.__eval_stable_p(chessman_color) + \
-            self.weights[2] * self.__eval_movers(valid_pos) + \
-            self.weights[3] * self.__eval_chessman_num(chessman_color) + \
-            self.weights[4] * self.__eval_overall_pos(chessman_color)
+        # 保存到置换表：没有超过my_score时只知道上界，发生剪枝时只知道下界
+        if key is not None:
+            if best_score <= my_score:
+                bound = UPPER
+            elif best_score > oppo_score:
+                bound = LOWER
+            else:
+                bound = EXACT
+            move = NO_MOVE if best_pos is None else int(best_pos[0] * 8 + best_pos[1])
+            self.tt.store(key, best_score, bound, depth, move)
+        return best_score, best_pos
 
-    # ---------------------------------private-----------------------------------
     def __get_valid_pos(self, chessman_color):
         """
         获取可落子的位置
         :param chessman_color: 执棋者棋子颜色
         :return pos:可落子位置
         """
-        tab = BLACK_TAB if chessman_color else WHITE_TAB
-        valid_pos = np.argwhere(self.board.xboard == tab)
-        return valid_pos
+        return self.board.get_valid_pos(chessman_color)
 
     def __chess(self, pos, chessman_color):
         """
         执棋者下棋
         :param pos:落子位置
         :param chessman_color:执棋者棋子颜色
+        :return flipped:被反转的棋子的位置
         """
-        self.board.board[pos[0], pos[1]] = CHESSMAN  # 暂时用'O'填充到落子所在的位置，方便接下来将对手棋子进行反转
-        self.board.covert_color(pos, chessman_color)  # 反转对方棋子颜色
+        return self.board.covert_color(pos, chessman_color)  # 落子并反转对方棋子颜色
+
+    def __update_killer(self, ply, move, chessman_color, depth):
+        """
+        move引起了剪枝，更新杀手表和历史表
+        """
+        killers = self.__killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.__history[chessman_color][move] += depth * depth
+
+    def __reset_eval(self):
+        """
+        从棋盘重新计算估价函数用到的统计量
+        """
+        for color in (BLACK, WHITE):
+            self.__discs[color] = self.__pos_score[color] = self.__corners[color] = 0
+            self.__edge_discs[color][:] = [0, 0, 0, 0]
+        for color in (BLACK, WHITE):
+            for r, c in np.argwhere(self.board.board == color):
+                self.__add_disc(r * 8 + c, color, 1)
+        cells = self.board.board.ravel()
+        for e, edge in enumerate(EDGE_CELLS):
+            self.__edge_blank[e] = sum(1 for index in edge if cells[index] == BLANK)
+
+    def __update_eval(self, pos, flipped, chessman_color, n):
+        """
+        落子(n=1)或回溯(n=-1)时增量更新估价函数用到的统计量
+        :param flipped: Board.covert_color返回的被反转的棋子
+        """
+        my_color = BLACK if chessman_color else WHITE
+        oppo_color = WHITE if chessman_color else BLACK
+        index = pos[0] * 8 + pos[1]
+        self.__add_disc(index, my_color, n)
+        for e, _ in EDGE_OF[index]:
+            self.__edge_blank[e] -= n
+        for p in flipped:
+            index = p[0] * 8 + p[1]
+            self.__add_disc(index, oppo_color, -n)
+            self.__add_disc(index, my_color, n)
+
+    def __add_disc(self, index, color, n):
+        self.__discs[color] += n
+        self.__pos_score[color] += self.__weight_list[index] * n
+        if index in CORNER_CELLS:
+            self.__corners[color] += n
+        for e, counted in EDGE_OF[index]:
+            if counted:
+                self.__edge_discs[color][e] += n
 
     # --------------------------------估计函数----------------------------------------
     def __eval_parity(self, chessman_color, parity):
@@ -167,27 +443,13 @@ class AIV2:
         :return stable_points:稳定点数
         """
         my_color = BLACK if chessman_color else WHITE  # 自己棋子的颜色
-        up_row = self.board.board[1, :]
-        down_row = self.board.board[-2, :]
-        left_col = self.board.board[:, 2]
-        right_col = self.board.board[:, -2]
-
-        stable_points = 0
         # 模糊计算，当边界都填满棋子时这些棋子肯定不能再被反转。本算法只考虑这种情况的稳定点
-        # 这里计算时先避开四个端点，稍后再计算
-        if not np.any(up_row == BLANK):
-            stable_points += np.sum((up_row == my_color)[2:-2])
-        if not np.any(down_row == BLANK):
-            stable_points += np.sum((down_row == my_color)[2:-2])
-        if not np.any(left_col == BLANK):
-            stable_points += np.sum((left_col == my_color)[2:-2])
-        if not np.any(right_col == BLANK):
-            stable_points += np.sum((right_col == my_color)[2:-2])
-        # 四个端点
-        stable_points += (self.board.board[1, 1] == my_color)
-        stable_points += (self.board.board[1, 6] == my_color)
-        stable_points += (self.board.board[6, 1] == my_color)
-        stable_points += (self.board.board[6, 6] == my_color)
+        # 边上的统计不包括四个端点，端点单独计算
+        stable_points = self.__corners[my_color]
+        edge_discs = self.__edge_discs[my_color]
+        for e in range(4):
+            if not self.__edge_blank[e]:
+                stable_points += edge_discs[e]
         return stable_points
 
     def __eval_movers(self, valid_pos):
@@ -203,32 +465,17 @@ class AIV2:
         :param chessman_color:执棋者棋子颜色
         """
         my_color = BLACK if chessman_color else WHITE  # 自己棋子的颜色
-        white_num = np.count_nonzero(self.board.board == WHITE)
-        black_num = np.count_nonzero(self.board.board == BLACK)
+        white_num = self.__discs[WHITE]
+        black_num = self.__discs[BLACK]
         return black_num - white_num if my_color else white_num - black_num
 
     def __eval_overall_pos(self, chessman_color):
         """
-        评估伪叶子节点的得分。
-        1. 根据权重表计算自己的得分
-        2. 根据权重表计算对手的得分
-        3， score = 1式 - 2式
+        评估伪叶子节点的得分：根据权重表计算的自己的得分 - 对手的得分
         :param chessman_color: 执棋者棋子颜色
         :return score: 得分
         """
-        score = 0  # 得分
         my_color = BLACK if chessman_color else WHITE  # 自己棋子的颜色
         oppo_color = WHITE if chessman_color else BLACK  # 对手棋子的颜色
-
-        # 获得双方棋子的位置
-        my_pos = np.argwhere(self.board.board == my_color)
-        oppo_pos = np.argwhere(self.board.board == oppo_color)
-
-        # 计算得分
-        for p in my_pos:
-            score += int(self.pos_weight[p[0], p[1]])
-        for p in oppo_pos:
-            score -= int(self.pos_weight[p[0], p[1]])
-
-        return score
+        return self.__pos_score[my_color] - self.__pos_score[oppo_color]
     # --------------------------------估计函数----------------------------------------
@@ -0,0 +1,199 @@
+"""
+6*6棋盘的位棋盘。
+第i位表示棋盘上第i // 6行第i % 6列，对应Board.board中的第i // 6 + 1行第i % 6 + 1列(Board.board带有边框)。
+"""
+import numpy as np
+from const import *
+
+# --------------------------------------global-----------------------------------------
+SIZE = 6
+FULL = (1 << SIZE * SIZE) - 1
+NOT_COL0 = FULL & ~sum(1 << (r * SIZE) for r in range(SIZE))  # 去掉第0列
+NOT_COL5 = FULL & ~sum(1 << (r * SIZE + SIZE - 1) for r in range(SIZE))  # 去掉第5列
+INNER = NOT_COL0 & NOT_COL5  # 去掉第0列和第5列
+
+
+def to_e(x):
+    return (x << 1) & NOT_COL0
+
+
+def to_w(x):
+    return (x >> 1) & NOT_COL5
+
+
+def to_s(x):
+    return (x << SIZE) & FULL
+
+
+def to_n(x):
+    return x >> SIZE
+
+
+def to_se(x):
+    return (x << (SIZE + 1)) & NOT_COL0
+
+
+def to_sw(x):
+    return (x << (SIZE - 1)) & NOT_COL5
+
+
+def to_ne(x):
+    return (x >> (SIZE - 1)) & NOT_COL0
+
+
+def to_nw(x):
+    return (x >> (SIZE + 1)) & NOT_COL5
+
+
+DIRECTIONS = (to_n, to_s, to_w, to_e, to_nw, to_ne, to_sw, to_se)
+
+if hasattr(int, 'bit_count'):
+    def popcount(x):
+        return x.bit_count()
+else:  # python3.10之前没有int.bit_count
+    def popcount(x):
+        return bin(x).count('1')
+
+
+def iter_bits(x):
+    """
+    从低位到高位依次取出x中为1的位置
+    """
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+def get_valid_bits(my, opp):
+    """
+    与py/bitboard.py相同，把8个方向的函数调用展开了。对手棋子只取中间4列，东西方向和对角线方向移位时不会跨行
+    :return moves: 执棋方可以落子的位置
+    """
+    inner = opp & INNER
+    moves = 0
+    # 南北、东西、西南东北、东南西北四组方向，左移和右移各对应一个方向。一条线上最多有4个连续的对手棋子
+    for shift, o in ((SIZE, opp), (1, inner), (SIZE - 1, inner), (SIZE + 1, inner)):
+        x = o & (my << shift)
+        x |= o & (x << shift)
+        x |= o & (x << shift)
+        x |= o & (x << shift)
+        moves |= x << shift
+
+        x = o & (my >> shift)
+        x |= o & (x >> shift)
+        x |= o & (x >> shift)
+        x |= o & (x >> shift)
+        moves |= x >> shift
+    return moves & ~(my | opp) & FULL
+
+
+def get_flip_bits(my, opp, sq):
+    """
+    :return flips: 在sq落子之后被反转的棋子，sq不能落子时为0
+    """
+    flips = 0
+    for shift in DIRECTIONS:
+        line = 0
+        x = shift(1 << sq)
+        while x & opp:
+            line |= x
+            x = shift(x)
+        if x & my:
+            flips |= line
+    return flips
+
+
+def square(pos):
+    """
+    Board.board中的位置(行, 列)转换为位棋盘的编号
+    """
+    return int((pos[0] - 1) * SIZE + pos[1] - 1)
+
+
+def position(sq):
+    """
+    square的逆运算
+    """
+    return np.array([sq // SIZE + 1, sq % SIZE + 1])
+
+
+def from_board(board):
+    """
+    :param board: Board.board
+    :return black, white: 黑子和白子的位棋盘
+    """
+    cells = board[1:-1, 1:-1].ravel()
+    black = white = 0
+    for sq in np.flatnonzero(cells == BLACK):
+        black |= 1 << int(sq)
+    for sq in np.flatnonzero(cells == WHITE):
+        white |= 1 << int(sq)
+    return black, white
+
+
+def to_board(black, white):
+    """
+    from_board的逆运算
+    :return board: Board.board形式的数组(带边框)
+    """
+    board = np.full((SIZE + 2, SIZE + 2), BLANK)
+    board[0, :], board[-1, :] = '─', '─'
+    board[:, 0], board[:, -1] = '│', '│'
+    board[0, 0], board[0, -1], board[-1, 0], board[-1, -1] = '┌', '┐', '└', '┘'
+    cells = board[1:-1, 1:-1]
+    for sq in iter_bits(black):
+        cells[sq // SIZE, sq % SIZE] = BLACK
+    for sq in iter_bits(white):
+        cells[sq // SIZE, sq % SIZE] = WHITE
+    return board
+
+
+# --------------------------------------symmetry-----------------------------------------
+# 8种对称变换，编号t的三个比特依次表示：先沿主对角线翻转(4)，再上下翻转(2)，最后左右翻转(1)，与py/symmetry.py相同
+NUM_TRANSFORMS = 8
+
+
+def _transform_square(sq, t):
+    r, c = sq // SIZE, sq % SIZE
+    if t & 4:
+        r, c = c, r
+    if t & 2:
+        r = SIZE - 1 - r
+    if t & 1:
+        c = SIZE - 1 - c
+    return r * SIZE + c
+
+
+# SQUARE_MAP[t][sq]：第sq个位置经过第t种变换之后的位置
+SQUARE_MAP = [[_transform_square(sq, t) for sq in range(SIZE * SIZE)] for t in range(NUM_TRANSFORMS)]
+# INVERSE[t]：第t种变换的逆变换
+INVERSE = [next(u for u in range(NUM_TRANSFORMS)
+                if all(SQUARE_MAP[u][SQUARE_MAP[t][sq]] == sq for sq in range(SIZE * SIZE)))
+           for t in range(NUM_TRANSFORMS)]
+
+
+def transform(x, t):
+    """
+    对位棋盘做第t种变换
+    """
+    square_map = SQUARE_MAP[t]
+    y = 0
+    for sq in iter_bits(x):
+        y |= 1 << square_map[sq]
+    return y
+
+
+def canonical(black, white):
+    """
+    8种对称局面中(black, white)最小的那个作为代表
+    :return key, t: key = black' << 36 | white'，t为变换编号
+    """
+    best_key = None
+    best_t = 0
+    for t in range(NUM_TRANSFORMS):
+        key = (transform(black, t) << (SIZE * SIZE)) | transform(white, t)
+        if best_key is None or key < best_key:
+            best_key = key
+            best_t = t
+    return best_key, best_t
@@ -1,9 +1,174 @@
+"""
+6*6棋盘。
+Board用两个36位整数(位棋盘，见bitboard4train)保存黑子和白子，board和xboard是按需生成的Board.board形式的数组，
+也可以整体赋值。双方的可落子位置在第一次用到时计算并保存，落子后失效，悔棋时恢复落子前保存的结果。ArrayBoard是原来直接在字符数组上切片查找、反转的实现，接口相同，用于交叉验证：
+    python board4train.py --games 200
+"""
+import argparse
+import random
+import time
 from const import *
 import numpy as np
 import copy
+from bitboard4train import get_valid_bits, get_flip_bits, iter_bits, popcount, from_board, to_board, SIZE
+
+# --------------------------------------global-----------------------------------------
+INIT_BLACK = (1 << 15) | (1 << 20)  # 初始局面黑子在(3, 4)和(4, 3)
+INIT_WHITE = (1 << 14) | (1 << 21)  # 初始局面白子在(3, 3)和(4, 4)
+# POSITIONS[sq]：位棋盘第sq位在Board.board中的位置(行, 列)
+POSITIONS = np.array([[sq // SIZE + 1, sq % SIZE + 1] for sq in range(SIZE * SIZE)])
+
+
+def _bits(positions):
+    """
+    Board.board中的位置列表转换为位棋盘
+    """
+    x = 0
+    for p in positions:
+        x |= 1 << int((p[0] - 1) * SIZE + p[1] - 1)
+    return x
 
 
 class Board:
+    def __init__(self):
+        self.black = INIT_BLACK  # 黑子的位棋盘
+        self.white = INIT_WHITE  # 白子的位棋盘
+        self.parity = 0
+        self.__marks = 0  # 上一次find_position标记的可落子位置
+        self.__mark_color = True  # 标记的是哪一方的可落子位置
+        self.__moves = {True: None, False: None}  # 当前局面双方的可落子位置，None表示还没有计算
+        self.__saved = []  # 每次落子之前的(black, white, 黑方可落子位置, 白方可落子位置)，悔棋时恢复
+
+    # ---------------------------------public-----------------------------------
+    @property
+    def board(self):
+        """
+        未进行标记的棋盘，每次生成新的数组，修改它不会改变棋盘，需要整体赋值
+        """
+        return to_board(self.black, self.white)
+
+    @board.setter
+    def board(self, board):
+        self.black, self.white = from_board(board)
+        self.__moves[True] = self.__moves[False] = None
+        self.__saved.clear()
+
+    @property
+    def xboard(self):
+        """
+        标记了可落子位置的棋盘
+        """
+        xboard = to_board(self.black, self.white)
+        if self.__marks:
+            rows, cols = POSITIONS[list(iter_bits(self.__marks))].T
+            xboard[rows, cols] = BLACK_TAB if self.__mark_color else WHITE_TAB
+        return xboard
+
+    @xboard.setter
+    def xboard(self, xboard):
+        """
+        只取出xboard上的标记，Game.congratulate赋值为未标记的棋盘时清除标记
+        """
+        black_marks = _bits(np.argwhere(xboard == BLACK_TAB))
+        self.__mark_color = bool(black_marks)
+        self.__marks = black_marks or _bits(np.argwhere(xboard == WHITE_TAB))
+
+    def find_position(self, chessman_color):
+        """
+        标记执棋者可以落子的位置
+        :param chessman_color: bool， 执棋者的棋子颜色，True表示黑子
+        :return flag:bool，True表示执棋者有位置落子
+        """
+        self.__marks = self.__legal_bits(chessman_color)
+        self.__mark_color = chessman_color
+        return self.__marks != 0
+
+    def mobility(self, chessman_color):
+        """
+        执棋者可落子位置的个数，不改变标记。双方的结果都会保存，反复查询不需要重新计算
+        :param chessman_color: bool， 执棋者的棋子颜色，True表示黑子
+        """
+        return popcount(self.__legal_bits(chessman_color))
+
+    def get_valid_pos(self, chessman_color):
+        """
+        :return valid_pos: 上一次标记的执棋者可落子位置，与np.argwhere(xboard == tab)相同
+        """
+        if self.__mark_color != chessman_color:
+            return POSITIONS[:0]
+        return POSITIONS[list(iter_bits(self.__marks))]
+
+    def covert_color(self, pos, chessman_color):
+        """
+        在pos落子并逆转对手棋子的颜色(不需要先在pos填充CHESSMAN)
+        :param pos:执棋者落子的位置
+        :param chessman_color:执棋者棋子的颜色
+        :return flipped:被反转的棋子的位置，供undo_color使用
+        """
+        sq = int((pos[0] - 1) * SIZE + pos[1] - 1)
+        moves = self.__moves
+        self.__saved.append((self.black, self.white, moves[True], moves[False]))
+        moves[True] = moves[False] = None
+        if chessman_color:
+            flips = get_flip_bits(self.black, self.white, sq)
+            self.black |= flips | (1 << sq)
+            self.white ^= flips
+        else:
+            flips = get_flip_bits(self.white, self.black, sq)
+            self.white |= flips | (1 << sq)
+            self.black ^= flips
+        return [(s // SIZE + 1, s % SIZE + 1) for s in iter_bits(flips)]
+
+    def undo_color(self, pos, flipped, chessman_color):
+        """
+        悔棋，covert_color的逆操作
+        :param pos:执棋者落子的位置
+        :param flipped:covert_color返回的被反转的棋子的位置
+        :param chessman_color:执棋者棋子的颜色
+        """
+        flips = _bits(flipped)
+        placed = flips | (1 << int((pos[0] - 1) * SIZE + pos[1] - 1))
+        if chessman_color:
+            self.black &= ~placed
+            self.white |= flips
+        else:
+            self.white &= ~placed
+            self.black |= flips
+        # 悔的是最近一步棋时恢复落子前的可落子位置，否则重新计算
+        if self.__saved:
+            black, white, black_moves, white_moves = self.__saved.pop()
+            if black == self.black and white == self.white:
+                self.__moves[True], self.__moves[False] = black_moves, white_moves
+                return
+            self.__saved.clear()
+        self.__moves[True] = self.__moves[False] = None
+
+    def mark_positions(self, valid_pos, chessman_color):
+        """
+        根据已知的可落子位置恢复标记，结果与find_position(chessman_color)相同
+        :param valid_pos:可落子位置，即find_position标记的位置
+        :param chessman_color: bool， 执棋者的棋子颜色，True表示黑子
+        """
+        self.__marks = _bits(valid_pos)
+        self.__mark_color = chessman_color
+        self.__moves[chessman_color] = self.__marks
+
+    # ---------------------------------private-----------------------------------
+    def __legal_bits(self, chessman_color):
+        """
+        :return moves: 当前局面执棋者的可落子位置
+        """
+        moves = self.__moves[chessman_color]
+        if moves is None:
+            if chessman_color:
+                moves = get_valid_bits(self.black, self.white)
+            else:
+                moves = get_valid_bits(self.white, self.black)
+            self.__moves[chessman_color] = moves
+        return moves
+
+
+class ArrayBoard:
     def __init__(self):
         self.board = np.array([
             ['┌', '─', '─', '─', '─', '─', '─', '┐'],
@@ -27,7 +192,10 @@ class Board:
         :param chessman_color: bool， 执棋者的棋子颜色，True表示黑子
         :return flag:bool，True表示执棋者有位置落子
         """
-        self.xboard = copy.deepcopy(self.board)
+        if self.xboard is self.board:  # Game.congratulate会让两者指向同一个数组
+            self.xboard = copy.deepcopy(self.board)
+        else:
+            np.copyto(self.xboard, self.board)  # 直接覆盖原来的标记，不再分配新的棋盘
         flag = []
         for i in range(1, 7):
             row = self.xboard[i, :]  # 切出第i行
@@ -58,11 +226,14 @@ class Board:
         逆转对手棋子的颜色
         :param pos:执棋者落子的位置
         :param chessman_color:执棋者棋子的颜色
+        :return flipped:被反转的棋子的位置，供undo_color使用
         """
+        flipped = []
+        self.board[pos[0], pos[1]] = CHESSMAN  # 用'O'填充到落子所在的位置，方便接下来将对手棋子进行反转
         row = self.board[pos[0], :]  # 切出行
         col = self.board[:, pos[1]]  # 切出列
-        self.__convert_seq(row, chessman_color)
-        self.__convert_seq(col, chessman_color)
+        flipped += [(pos[0], k) for k in self.__convert_seq(row, chessman_color)]
+        flipped += [(k, pos[1]) for k in self.__convert_seq(col, chessman_color)]
         # -花式索引获得对角线序列
         # --切出对角线(左上角到右下角)
         if pos[0] >= pos[1]:
@@ -72,7 +243,7 @@ class Board:
             r_index = np.array([_ for _ in range(0, 8 - (pos[1] - pos[0]))])
             c_index = np.array([_ for _ in range(pos[1] - pos[0], 8)])
         adiag = self.board[r_index, c_index]
-        self.__convert_seq(adiag, chessman_color)
+        flipped += [(r_index[k], c_index[k]) for k in self.__convert_seq(adiag, chessman_color)]
         self.board[r_index, c_index] = adiag
         # --切出对角线(左下角到右上角)
         if pos[0] + pos[1] < 8:
@@ -82,9 +253,45 @@ class Board:
             r_index = np.array([_ for _ in range(pos[0] + pos[1] - 7, 8)])
             c_index = np.array([_ for _ in range(pos[0] + pos[1] - 7, 8)][::-1])
         diag = self.board[r_index, c_index]
-        self.__convert_seq(diag, chessman_color)
+        flipped += [(r_index[k], c_index[k]) for k in self.__convert_seq(diag, chessman_color)]
         self.board[r_index, c_index] = diag
         self.board[pos[0], pos[1]] = BLACK if chessman_color else WHITE
+        return flipped
+
+    def get_valid_pos(self, chessman_color):
+        """
+        :return valid_pos: 上一次标记的执棋者可落子位置
+        """
+        return np.argwhere(self.xboard == (BLACK_TAB if chessman_color else WHITE_TAB))
+
+    def mobility(self, chessman_color):
+        """
+        执棋者可落子位置的个数，不改变标记
+        """
+        black, white = from_board(self.board)
+        return popcount(get_valid_bits(black, white) if chessman_color else get_valid_bits(white, black))
+
+    def undo_color(self, pos, flipped, chessman_color):
+        """
+        悔棋，covert_color的逆操作
+        :param pos:执棋者落子的位置
+        :param flipped:covert_color返回的被反转的棋子的位置
+        :param chessman_color:执棋者棋子的颜色
+        """
+        oppo_color = WHITE if chessman_color else BLACK
+        for p in flipped:
+            self.board[p[0], p[1]] = oppo_color
+        self.board[pos[0], pos[1]] = BLANK
+
+    def mark_positions(self, valid_pos, chessman_color):
+        """
+        根据已知的可落子位置恢复xboard上的标记，结果与find_position(chessman_color)相同
+        :param valid_pos:可落子位置，即find_position标记的位置
+        :param chessman_color: bool， 执棋者的棋子颜色，True表示黑子
+        """
+        np.copyto(self.xboard, self.board)
+        if len(valid_pos):
+            self.xboard[valid_pos[:, 0], valid_pos[:, 1]] = BLACK_TAB if chessman_color else WHITE_TAB
 
     # ---------------------------------private-----------------------------------
     def __convert_seq(self, seq, chessman_color):
@@ -92,6 +299,7 @@ class Board:
         对棋盘的某个切片进行颜色反转
         :param seq:切片，注意不管是行切片、列切片还是对角线切片，得到的都是行向量或者说可以看成是行向量(numpy切片)
         :param chessman_color: bool， 执棋者的棋子颜色，True表示黑子
+        :return flipped:被反转的棋子在切片中的下标
         """
         if chessman_color:  # 判断当前执棋者的棋子颜色
             my_color = BLACK
@@ -99,6 +307,7 @@ class Board:
         else:
             my_color = WHITE
             oppo_color = BLACK
+        flipped = []
         my_index = np.argwhere(seq == CHESSMAN)  # 判断执棋者落子的位置
         if len(my_index):
             my_index = my_index[0, 0]
@@ -108,12 +317,15 @@ class Board:
                 i += 1
             if seq[i] == my_color:
                 seq[my_index + 1:i] = my_color
+                flipped += range(my_index + 1, i)
             # 从落子位置向左搜寻可翻转的棋子
             i = my_index - 1
             while seq[i] == oppo_color:
                 i -= 1
             if seq[i] == my_color:
                 seq[i + 1:my_index] = my_color
+                flipped += range(i + 1, my_index)
+        return flipped
 
     def __mark_position(self, sequence, chessman_color):
         """
@@ -161,3 +373,58 @@ class Board:
         if ok or ok1:
             flag = True
         return flag
+
+
+def cross_check(games=100, seed=0):
+    """
+    两种实现同时随机下棋(包括悔棋)，每一步比较棋盘、标记和被反转的棋子
+    :return positions: 比较过的局面数，不一致时抛出AssertionError
+    """
+    rng = random.Random(seed)
+    positions = 0
+    for _ in range(games):
+        fast, slow = Board(), ArrayBoard()
+        chessman_color = True
+        passes = 0
+        while passes < 2:
+            ok = fast.find_position(chessman_color)
+            assert ok == slow.find_position(chessman_color)
+            assert np.array_equal(fast.xboard, slow.xboard)
+            valid_pos = slow.get_valid_pos(chessman_color)
+            assert np.array_equal(fast.get_valid_pos(chessman_color), valid_pos)
+            for color in (True, False):
+                assert fast.mobility(color) == slow.mobility(color)
+            positions += 1
+            if ok:
+                # 先试下一步再悔棋，检查undo_color和mark_positions
+                pos = valid_pos[rng.randrange(len(valid_pos))]
+                for board in (fast, slow):
+                    flipped = board.covert_color(pos, chessman_color)
+                    board.undo_color(pos, flipped, chessman_color)
+                    board.mark_positions(valid_pos, chessman_color)
+                assert np.array_equal(fast.xboard, slow.xboard)
+                assert fast.mobility(not chessman_color) == slow.mobility(not chessman_color)
+                pos = valid_pos[rng.randrange(len(valid_pos))]
+                flipped = fast.covert_color(pos, chessman_color)
+                assert sorted(flipped) == sorted((int(r), int(c)) for r, c in slow.covert_color(pos, chessman_color))
+                assert np.array_equal(fast.board, slow.board)
+                passes = 0
+            else:
+                passes += 1
+            chessman_color = not chessman_color
+    return positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cross-check the bitboard Board against ArrayBoard")
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    positions = cross_check(args.games, args.seed)
+    print("{} games, {} positions ok ({:.2f}s)".format(args.games, positions, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+6*6棋盘的开局库，与py/book.py相同：离线用AIV2展开开局树，保存每个局面的最佳落子位置，AIV2.think先查表。
+
+局面先变换为8种对称局面中的代表(bitboard4train.canonical)，再连同执棋方一起哈希为64位整数。
+文件格式：8字节文件头 b'RVB6' + 版本号(1字节) + 3字节保留，
+之后是局面数n(uint64)、从小到大排好序的n个哈希值(uint64)、n个代表局面中的落子位置(uint8，位棋盘编号)。
+
+生成开局库(weights为ai_trainer保存的染色体)：
+    python book4train.py --ply 6 --depth 4 --weights save/10.json --out book6x6.bin
+"""
+import argparse
+import json
+import time
+import numpy as np
+from const import *
+from board import Board
+from ai_v2_4train import AIV2
+from bitboard4train import get_valid_bits, get_flip_bits, iter_bits, from_board, to_board, canonical, square, \
+    position, SQUARE_MAP, INVERSE, SIZE
+
+# --------------------------------------global-----------------------------------------
+MAGIC = b'RVB6'
+VERSION = 1
+HEADER_SIZE = 8
+MASK = 0xffff_ffff_ffff_ffff
+WHITE_KEY = 0x9e3779b97f4a7c15  # 白方执棋时异或到哈希值上
+
+
+def _mix(x):
+    """
+    splitmix64的最后一步，把64位整数打散
+    """
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & MASK
+    return x ^ (x >> 31)
+
+
+def position_hash(black, white, chessman_color):
+    """
+    :param chessman_color: bool，True表示黑方执棋
+    :return h, t: 局面的64位哈希值(与对称变换无关)和变换到代表局面的变换编号
+    """
+    key, t = canonical(black, white)
+    h = _mix((key >> (SIZE * SIZE)) ^ _mix(key & ((1 << SIZE * SIZE) - 1)))
+    if not chessman_color:
+        h ^= WHITE_KEY
+    return h, t
+
+
+class OpeningBook:
+    def __init__(self, keys=None, moves=None):
+        """
+        :param keys: 从小到大排好序的哈希值，np.uint64数组
+        :param moves: 代表局面中的落子位置(位棋盘编号)，np.uint8数组
+        """
+        self.keys = np.zeros(0, dtype=np.uint64) if keys is None else np.asarray(keys, dtype=np.uint64)
+        self.moves = np.zeros(0, dtype=np.uint8) if moves is None else np.asarray(moves, dtype=np.uint8)
+        self.hits = 0
+        self.misses = 0
+
+    # ---------------------------------public-----------------------------------
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+            if header[:4] != MAGIC:
+                raise ValueError("{} is not a 6x6 opening book".format(path))
+            if header[4] != VERSION:
+                raise ValueError("unsupported opening book version {}".format(header[4]))
+            n = int(np.fromfile(f, dtype='<u8', count=1)[0])
+            keys = np.fromfile(f, dtype='<u8', count=n).astype(np.uint64)
+            moves = np.fromfile(f, dtype=np.uint8, count=n)
+        return cls(keys, moves)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(MAGIC + bytes([VERSION, 0, 0, 0]))
+            np.array([len(self)], dtype='<u8').tofile(f)
+            self.keys.astype('<u8').tofile(f)
+            self.moves.tofile(f)
+
+    def lookup(self, board, chessman_color):
+        """
+        :param board: Board.board
+        :param chessman_color: bool，True表示黑方执棋
+        :return pos: Board.board中的落子位置(行, 列)，不在库中时为None
+        """
+        black, white = from_board(board)
+        h, t = position_hash(black, white, chessman_color)
+        i = int(np.searchsorted(self.keys, np.uint64(h)))
+        if i == len(self.keys) or int(self.keys[i]) != h:
+            self.misses += 1
+            return None
+        sq = SQUARE_MAP[INVERSE[t]][int(self.moves[i])]
+        # 哈希冲突时返回的位置可能不合法，当作不在库中
+        my, opp = (black, white) if chessman_color else (white, black)
+        if not get_valid_bits(my, opp) >> sq & 1:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return position(sq)
+
+    @property
+    def nbytes(self):
+        return HEADER_SIZE + 8 + self.keys.nbytes + self.moves.nbytes
+
+    def __len__(self):
+        return self.keys.shape[0]
+
+
+def build(max_ply, weights=(0.5, 0.5, 0.5, 0.5, 0.5), depth=4, verbose=False):
+    """
+    从初始局面出发展开双方所有的落子，直到第max_ply步，用AIV2搜索每个局面的最佳落子位置。
+    对称的局面只搜索一次。开局阶段不会出现无处落子，奇偶性都为0
+    :param max_ply: 开局库覆盖的步数
+    :param weights: AIV2的权重
+    :param depth: AIV2的搜索深度
+    :return book: OpeningBook
+    """
+    board = Board()
+    ai = AIV2(board, weights, depth)
+    entries = {}  # 哈希值 -> 代表局面中的落子位置
+    frontier = [from_board(board.board) + (True,)]
+    for ply in range(max_ply):
+        start = time.perf_counter()
+        children = {}
+        for black, white, chessman_color in frontier:
+            my, opp = (black, white) if chessman_color else (white, black)
+            moves = get_valid_bits(my, opp)
+            if not moves:  # 跳过
+                if get_valid_bits(opp, my):
+                    children.setdefault(position_hash(black, white, not chessman_color)[0],
+                                        (black, white, not chessman_color))
+                continue
+            board.board = to_board(black, white)
+            board.find_position(chessman_color)
+            _, pos = ai.alpha_beta_minimax(chessman_color, depth, parity=0)
+            h, t = position_hash(black, white, chessman_color)
+            entries[h] = SQUARE_MAP[t][square(pos)]
+            for sq in iter_bits(moves):
+                flips = get_flip_bits(my, opp, sq)
+                new_my, new_opp = my | flips | (1 << sq), opp ^ flips
+                child = (new_my, new_opp) if chessman_color else (new_opp, new_my)
+                children.setdefault(position_hash(child[0], child[1], not chessman_color)[0],
+                                    child + (not chessman_color,))
+        if verbose:
+            print("ply {:2d}  positions {:8d}  time {:8.2f}s".format(ply, len(frontier), time.perf_counter() - start))
+        frontier = list(children.values())
+
+    keys = np.array(sorted(entries), dtype=np.uint64)
+    moves = np.array([entries[int(h)] for h in keys], dtype=np.uint8)
+    return OpeningBook(keys, moves)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="build an opening book for the 6x6 training board")
+    parser.add_argument('--ply', type=int, default=6)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--weights', help="ai_trainer保存的染色体(json)，不指定时权重都为0.5")
+    parser.add_argument('--out', default='book6x6.bin')
+    args = parser.parse_args()
+
+    weights = (0.5, 0.5, 0.5, 0.5, 0.5)
+    if args.weights:
+        with open(args.weights) as f:
+            weights = [x / 255 for x in json.load(f)]
+    book = build(args.ply, weights, args.depth, verbose=True)
+    book.save(args.out)
+    print("{} positions, {} bytes -> {}".format(len(book), book.nbytes, args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+6*6棋盘的残局精确求解，与py/endgame.py相同，只是换成了6*6的位棋盘。
+得分为执棋方的棋子数减去对手的棋子数，与Game.check_is_finish的判断方式一致，剩下的空位不计入任何一方。
+
+落子顺序：
+    1. 奇偶性：棋盘分为四个3*3的区域，优先在空位数为奇数的区域落子，这样自己更有可能在该区域下最后一步
+    2. 最快优先(fastest-first)：空位较多时，优先搜索落子之后对手行动力最小的位置
+最后1、2、3个空位使用专门的函数，直接尝试每个空位，不再生成走法。
+"""
+import time
+from bitboard4train import get_valid_bits, get_flip_bits, popcount, iter_bits, from_board, position, FULL
+
+# --------------------------------------global-----------------------------------------
+INF = 37  # 大于任何可能的棋子差
+FASTEST_FIRST_EMPTIES = 7  # 空位数不少于这个值时使用最快优先排序，更少时只按奇偶性排序
+
+
+def _quadrant(sq):
+    return (sq // 6 >= 3) * 2 + (sq % 6 >= 3)
+
+
+QUADRANT = [_quadrant(sq) for sq in range(36)]  # QUADRANT[sq]：sq所在的区域
+QUADRANT_MASK = [sum(1 << sq for sq in range(36) if QUADRANT[sq] == q) for q in range(4)]
+
+
+def final_score(my, opp):
+    """
+    终局时执棋方的得分
+    """
+    return popcount(my) - popcount(opp)
+
+
+class EndgameSolver:
+    def __init__(self, wld=False):
+        """
+        :param wld: True表示只判断胜负平(零窗口搜索，更快)，得分为1、0、-1
+        """
+        self.wld = wld
+        self.nodes = 0
+        self.stats = {'empties': 0, 'nodes': 0, 'seconds': 0.0, 'nps': 0.0}
+
+    # --------------------------------------public-----------------------------------------
+    def solve(self, my, opp):
+        """
+        :param my: 执棋方的位棋盘
+        :param opp: 对手的位棋盘
+        :return score: 双方都下最优时执棋方最终的棋子差，wld时为1、0、-1
+        """
+        return self.best_move(my, opp)[0]
+
+    def best_move(self, my, opp):
+        """
+        :return score, pos: 执棋方的得分和最佳落子位置，无处落子时pos为-1
+        """
+        self.nodes = 0
+        start = time.perf_counter()
+        alpha, beta = (-1, 1) if self.wld else (-INF, INF)
+        empty = ~(my | opp) & FULL
+        moves = get_valid_bits(my, opp)
+        if not moves:
+            best_score, best_pos = self.__solve(my, opp, alpha, beta), -1
+        else:
+            best_score, best_pos = -INF, -1
+            for sq in self.__order(my, opp, moves, empty):
+                flips = get_flip_bits(my, opp, sq)
+                score = -self.__solve(opp ^ flips, my | flips | (1 << sq), -beta, -max(alpha, best_score))
+                if score > best_score:
+                    best_score, best_pos = score, sq
+                    if best_score >= beta:
+                        break
+        if self.wld:
+            best_score = (best_score > 0) - (best_score < 0)
+        seconds = time.perf_counter() - start
+        self.stats = {
+            'empties': popcount(empty),
+            'nodes': self.nodes,
+            'seconds': seconds,
+            'nps': self.nodes / seconds if seconds > 0 else 0.0,
+        }
+        return best_score, best_pos
+
+    def think(self, board, chessman_color):
+        """
+        在Board的当前棋盘上为chessman_color一方求解
+        :param board: Board
+        :param chessman_color: bool，True表示黑子
+        :return score, pos: pos为Board.board中的位置(行, 列)，无处落子时为None
+        """
+        black, white = from_board(board.board)
+        my, opp = (black, white) if chessman_color else (white, black)
+        score, sq = self.best_move(my, opp)
+        return score, None if sq < 0 else position(sq)
+
+    # --------------------------------------private-----------------------------------------
+    def __solve(self, my, opp, alpha, beta):
+        """
+        fail-soft negamax
+        """
+        empty = ~(my | opp) & FULL
+        n = popcount(empty)
+        if n <= 3:
+            if n == 0:
+                self.nodes += 1
+                return final_score(my, opp)
+            squares = self.__parity_squares(empty)
+            if n == 3:
+                return self.__last3(my, opp, squares[0], squares[1], squares[2], alpha, beta)
+            if n == 2:
+                return self.__last2(my, opp, squares[0], squares[1], alpha, beta)
+            return self.__last1(my, opp, squares[0])
+
+        self.nodes += 1
+        moves = get_valid_bits(my, opp)
+        if not moves:
+            if not get_valid_bits(opp, my):  # 双方都无处落子，游戏结束
+                return final_score(my, opp)
+            return -self.__solve(opp, my, -beta, -alpha)
+
+        best_score = -INF
+        for sq in self.__order(my, opp, moves, empty):
+            flips = get_flip_bits(my, opp, sq)
+            score = -self.__solve(opp ^ flips, my | flips | (1 << sq), -beta, -max(alpha, best_score))
+            if score > best_score:
+                best_score = score
+                if best_score >= beta:  # 剪枝
+                    break
+        return best_score
+
+    def __last3(self, my, opp, sq1, sq2, sq3, alpha, beta):
+        """
+        最后3个空位，sq1, sq2, sq3已经按奇偶性排好序
+        """
+        self.nodes += 1
+        best_score = -INF
+        for sq, a, b in ((sq1, sq2, sq3), (sq2, sq1, sq3), (sq3, sq1, sq2)):
+            flips = get_flip_bits(my, opp, sq)
+            if flips:
+                score = -self.__last2(opp ^ flips, my | flips | (1 << sq), a, b, -beta, -max(alpha, best_score))
+                if score > best_score:
+                    best_score = score
+                    if best_score >= beta:
+                        return best_score
+        if best_score != -INF:
+            return best_score
+        # 自己无处落子，轮到对方，自己的得分为对方各种落子之后的最小值
+        worst_score = INF
+        for sq, a, b in ((sq1, sq2, sq3), (sq2, sq1, sq3), (sq3, sq1, sq2)):
+            flips = get_flip_bits(opp, my, sq)
+            if flips:
+                score = self.__last2(my ^ flips, opp | flips | (1 << sq), a, b, alpha, min(beta, worst_score))
+                if score < worst_score:
+                    worst_score = score
+                    if worst_score <= alpha:
+                        return worst_score
+        return final_score(my, opp) if worst_score == INF else worst_score
+
+    def __last2(self, my, opp, sq1, sq2, alpha, beta):
+        """
+        最后2个空位
+        """
+        self.nodes += 1
+        best_score = -INF
+        for sq, other in ((sq1, sq2), (sq2, sq1)):
+            flips = get_flip_bits(my, opp, sq)
+            if flips:
+                score = -self.__last1(opp ^ flips, my | flips | (1 << sq), other)
+                if score > best_score:
+                    best_score = score
+                    if best_score >= beta:
+                        return best_score
+        if best_score != -INF:
+            return best_score
+        # 自己无处落子，轮到对方，自己的得分为对方各种落子之后的最小值
+        worst_score = INF
+        for sq, other in ((sq1, sq2), (sq2, sq1)):
+            flips = get_flip_bits(opp, my, sq)
+            if flips:
+                score = self.__last1(my ^ flips, opp | flips | (1 << sq), other)
+                if score < worst_score:
+                    worst_score = score
+                    if worst_score <= alpha:
+                        return worst_score
+        return final_score(my, opp) if worst_score == INF else worst_score
+
+    def __last1(self, my, opp, sq):
+        """
+        最后1个空位，不需要搜索
+        """
+        self.nodes += 1
+        score = final_score(my, opp)
+        flips = get_flip_bits(my, opp, sq)
+        if flips:
+            return score + 2 * popcount(flips) + 1
+        flips = get_flip_bits(opp, my, sq)
+        if flips:
+            return score - 2 * popcount(flips) - 1
+        return score
+
+    def __parity_squares(self, empty):
+        """
+        空位按奇偶性排序：所在区域空位数为奇数的在前
+        """
+        odd = self.__odd_regions(empty)
+        return sorted(iter_bits(empty), key=lambda sq: not odd >> QUADRANT[sq] & 1)
+
+    def __odd_regions(self, empty):
+        """
+        :return odd: 第q位为1表示第q个区域的空位数为奇数
+        """
+        odd = 0
+        for q in range(4):
+            odd |= (popcount(empty & QUADRANT_MASK[q]) & 1) << q
+        return odd
+
+    def __order(self, my, opp, moves, empty):
+        """
+        落子顺序：空位多时按落子之后对手的行动力由小到大(最快优先)，再按奇偶性；空位少时只按奇偶性
+        """
+        odd = self.__odd_regions(empty)
+        if popcount(empty) < FASTEST_FIRST_EMPTIES:
+            return sorted(iter_bits(moves), key=lambda sq: not odd >> QUADRANT[sq] & 1)
+        keys = []
+        for sq in iter_bits(moves):
+            flips = get_flip_bits(my, opp, sq)
+            mobility = popcount(get_valid_bits(opp ^ flips, my | flips | (1 << sq)))
+            keys.append((mobility, not odd >> QUADRANT[sq] & 1, sq))
+        keys.sort()
+        return [key[2] for key in keys]
@@ -0,0 +1,75 @@
+"""
+AIV2叶子结点估值的缓存。
+估值只与棋盘、执棋方、奇偶性和权重有关，键为(棋盘的Zobrist哈希值, 执棋方, 奇偶性, 权重编号)。
+同一次搜索中经由不同顺序到达的局面、遗传算法一代中开局相同的多场比赛，都会反复估值同样的叶子。
+多个AIV2可以共用一个缓存，不同的权重用weights_id区分。超过size时淘汰最久没有用到的结果(LRU)。
+"""
+from collections import OrderedDict
+
+
+class EvalCache:
+    ENTRY_BYTES = 200  # 每个结果大约占用的内存(OrderedDict的结点、键元组和浮点数)
+
+    def __init__(self, size=1 << 18):
+        """
+        :param size: 最多保存的结果数，内存约为size * ENTRY_BYTES字节
+        """
+        self.size = size
+        self.table = OrderedDict()
+        self.__weight_ids = {}  # 权重 -> 编号
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # --------------------------------------public-----------------------------------------
+    def weights_id(self, weights):
+        """
+        :return id: 权重的编号，相同的权重编号相同
+        """
+        weights = tuple(weights)
+        wid = self.__weight_ids.get(weights)
+        if wid is None:
+            wid = self.__weight_ids[weights] = len(self.__weight_ids)
+        return wid
+
+    def get(self, key):
+        """
+        :return score or None: 不在缓存中时为None
+        """
+        score = self.table.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self.table.move_to_end(key)
+        self.hits += 1
+        return score
+
+    def put(self, key, score):
+        self.table[key] = score
+        if len(self.table) > self.size:
+            self.table.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.table.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    @property
+    def nbytes(self):
+        """
+        估计的内存占用(字节)
+        """
+        return len(self.table) * self.ENTRY_BYTES
+
+    def report(self):
+        return "eval cache: {}/{} entries, ~{:.1f} KB, hits {}, misses {}, hit rate {:.1%}, evictions {}".format(
+            len(self.table), self.size, self.nbytes / 1024, self.hits, self.misses, self.hit_rate, self.evictions)
+
+    def __len__(self):
+        return len(self.table)
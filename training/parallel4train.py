@@ -0,0 +1,200 @@
+"""
+AIV2的并行根结点搜索。
+先在本进程中搜索第一个可落子位置，得到alpha；其余的位置交给进程池，每个位置在一个进程中搜索。
+搜索出更好的结果时更新共享的alpha。任务只在开始时读取一次，已经在搜索的任务不受影响，之后开始的任务剪枝更多。
+每个进程按调用方AIV2的设置使用自己的置换表(在同一个进程的任务之间保留)和估值缓存。
+搜索是fail-hard的：得分大于搜索时所用的alpha才是精确值，否则只说明不超过这个alpha。
+后面的位置先搜完、把alpha提高到V时，前面的位置可能正好返回V，这些位置用完整窗口重新搜索，
+最后取精确值最大的位置中最前面的一个，与串行搜索相同。
+
+用法：
+    python parallel4train.py --depth 4 --workers 8     # 比较与串行搜索的速度
+"""
+import argparse
+import os
+import random
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from const import *
+from board import Board
+from ai_v2_4train import AIV2
+from evalcache4train import EvalCache
+
+# --------------------------------------worker-----------------------------------------
+MAX_WORKER_AIS = 16  # 每个进程最多保留的AIV2(及其置换表)个数
+_shared_alpha = None  # 进程池中共享的alpha
+_eval_cache = None  # 进程中的估值缓存，大小与调用方的相同
+_ais = {}  # (权重, 深度, 置换表大小) -> 进程中的AIV2
+
+
+def _init_worker(alpha):
+    global _shared_alpha
+    _shared_alpha = alpha
+
+
+def _worker_ai(weights, depth, tt_size, eval_cache_size):
+    """
+    :return ai: 本进程中与调用方设置相同的AIV2
+    """
+    global _eval_cache
+    if eval_cache_size and (_eval_cache is None or _eval_cache.size != eval_cache_size):
+        _eval_cache = EvalCache(eval_cache_size)
+    key = (tuple(weights), depth, tt_size)
+    ai = _ais.get(key)
+    if ai is None:
+        if len(_ais) >= MAX_WORKER_AIS:
+            _ais.clear()
+        ai = _ais[key] = AIV2(Board(), weights, depth, tt_size=tt_size)
+    ai.eval_cache = _eval_cache if eval_cache_size else None
+    return ai
+
+
+def _search_move(board, settings, chessman_color, parity, pos, alpha, shared=True):
+    """
+    在子进程中搜索根结点的一个落子位置
+    :param board: Board.board的副本
+    :param settings: (weights, depth, tt_size, eval_cache_size)，调用方AIV2的设置
+    :param shared: 是否使用共享的alpha(如果更大)
+    :return score, alpha: 执棋方在pos落子的得分和搜索时所用的alpha，score > alpha时为精确值
+    """
+    if shared:
+        alpha = max(alpha, _shared_alpha.value)
+    depth = settings[1]
+    ai = _worker_ai(*settings)
+    b = ai.board
+    b.board = board
+    b.covert_color(pos, chessman_color)
+    b.find_position(not chessman_color)
+    score, _ = ai.alpha_beta_minimax(not chessman_color, depth - 1, parity + 1, -float('inf'), -alpha)
+    return -score, alpha
+
+
+class ParallelRootSearch:
+    def __init__(self, workers=None):
+        """
+        :param workers: 进程数，None表示CPU核数
+        """
+        self.workers = workers or os.cpu_count()
+        self.alpha = multiprocessing.RawValue('d', -float('inf'))
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.alpha,))
+        self.stats = {'moves': 0, 'seconds': 0.0}
+
+    # --------------------------------------public-----------------------------------------
+    def search(self, ai, chessman_color, depth, parity=0):
+        """
+        与ai.alpha_beta_minimax(chessman_color, depth, parity)的结果相同。调用之前需要ai.board.find_position(chessman_color)
+        :param ai: AIV2，使用它的棋盘和权重
+        :return score, pos:
+        """
+        start = time.perf_counter()
+        board = ai.board
+        valid_pos = board.get_valid_pos(chessman_color)
+        if depth == 0 or len(valid_pos) < 2:
+            return ai.alpha_beta_minimax(chessman_color, depth, parity)
+
+        # 第一个位置串行搜索，确定alpha
+        pos = valid_pos[0]
+        flipped = board.covert_color(pos, chessman_color)
+        board.find_position(not chessman_color)
+        score, _ = ai.alpha_beta_minimax(not chessman_color, depth - 1, parity + 1)
+        board.undo_color(pos, flipped, chessman_color)
+        board.mark_positions(valid_pos, chessman_color)
+        scores = [-score]
+        exact = [True]
+        best_score = -score
+        self.alpha.value = best_score
+
+        # 其余的位置并行搜索。开局库只在think中查根结点，搜索中用不到，不传给子进程
+        settings = (ai.weights, depth, ai.tt_size, ai.eval_cache.size if ai.eval_cache is not None else 0)
+        futures = {}
+        for i in range(1, len(valid_pos)):
+            future = self.pool.submit(_search_move, board.board.copy(), settings, chessman_color, parity,
+                                      valid_pos[i], best_score)
+            futures[future] = i
+        scores += [None] * len(futures)
+        exact += [False] * len(futures)
+        alphas = [None] * len(scores)
+        for future in as_completed(futures):
+            score, alpha = future.result()
+            i = futures[future]
+            scores[i], alphas[i], exact[i] = score, alpha, score > alpha
+            if exact[i] and score > best_score:
+                best_score = score
+                self.alpha.value = best_score
+
+        # 最佳位置之前、以best_score为alpha失败的位置，真实得分可能也是best_score，用完整窗口重新搜索
+        first = next(i for i in range(len(scores)) if exact[i] and scores[i] == best_score)
+        futures = {}
+        for i in range(1, first):
+            if not exact[i] and alphas[i] == best_score:
+                future = self.pool.submit(_search_move, board.board.copy(), settings, chessman_color, parity,
+                                          valid_pos[i], -float('inf'), False)
+                futures[future] = i
+        for future in as_completed(futures):
+            scores[futures[future]], _ = future.result()
+            exact[futures[future]] = True
+
+        # 与串行搜索一样，得分相同时取最前面的位置
+        index = next(i for i in range(len(scores)) if exact[i] and scores[i] == best_score)
+        self.stats = {'moves': len(valid_pos), 'seconds': time.perf_counter() - start}
+        return scores[index], valid_pos[index]
+
+    def benchmark(self, ai, chessman_color, depth, parity=0):
+        """
+        在当前棋盘上比较串行搜索与并行搜索
+        :return dict: serial/parallel为用时(秒)，speedup为加速比，same为两者的结果是否相同
+        """
+        ai.board.find_position(chessman_color)
+        start = time.perf_counter()
+        serial = ai.alpha_beta_minimax(chessman_color, depth, parity)
+        serial_seconds = time.perf_counter() - start
+        ai.board.find_position(chessman_color)
+        start = time.perf_counter()
+        parallel = self.search(ai, chessman_color, depth, parity)
+        parallel_seconds = time.perf_counter() - start
+        return {
+            'serial': serial_seconds,
+            'parallel': parallel_seconds,
+            'speedup': serial_seconds / parallel_seconds if parallel_seconds > 0 else 0.0,
+            'same': serial[0] == parallel[0] and np.array_equal(serial[1], parallel[1]),
+        }
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AIV2 parallel root search benchmark")
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--plies', type=int, default=8, help="先随机下几步棋，得到中局局面")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    board = Board()
+    ai = AIV2(board, [rng.random() for _ in range(5)], args.depth)
+    chessman_color = True
+    for _ in range(args.plies):
+        if board.find_position(chessman_color):
+            valid_pos = board.get_valid_pos(chessman_color)
+            pos = valid_pos[rng.randrange(len(valid_pos))]
+            board.covert_color(pos, chessman_color)
+        chessman_color = not chessman_color
+
+    with ParallelRootSearch(args.workers) as search:
+        result = search.benchmark(ai, chessman_color, args.depth, board.parity)
+    print("workers {}  serial {:.3f}s  parallel {:.3f}s  speedup {:.2f}x  same result: {}".format(
+        search.workers, result['serial'], result['parallel'], result['speedup'], result['same']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+遗传算法的比赛安排。
+AIV2对同一对染色体、同样的执棋颜色和搜索深度总是下出同一盘棋，比赛结果保存在MatchCache中，
+之后的代中再遇到(保留下来的优胜种、重复的子代)不再重新比赛。
+除了全循环赛(每代POPULATION * (POPULATION - 1)场)之外，还可以用瑞士制、随机k个对手或固定的基准对手计算适应度，
+比赛场数少得多，用kendall_tau与全循环赛的排名比较。
+"""
+import json
+import os
+import random
+
+# --------------------------------------global-----------------------------------------
+CACHE_VERSION = 1
+
+
+class MatchCache:
+    def __init__(self, path=None, settings=None):
+        """
+        :param path: 保存比赛结果的json文件，None表示只在内存中保存(整个训练过程中有效)
+        :param settings: 其他影响比赛结果的设置(置换表大小、开局库等)，与文件中保存的不同时丢弃文件中的结果
+        """
+        self.path = path
+        self.settings = settings or {}
+        self.results = {}  # (chromosome1, chromosome2, color, depth) -> chromosome1的得分
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION and data.get('settings') == self.settings:
+                for chromosome1, chromosome2, color, depth, score in data['results']:
+                    self.results[(tuple(chromosome1), tuple(chromosome2), color, depth)] = score
+
+    # --------------------------------------public-----------------------------------------
+    @staticmethod
+    def key(chromosome1, chromosome2, color, depth):
+        """
+        :param color: chromosome1的执棋颜色，True表示黑子
+        """
+        return tuple(chromosome1), tuple(chromosome2), color, depth
+
+    def get(self, key):
+        """
+        :return score or None: 不在缓存中时为None
+        """
+        score = self.results.get(key)
+        if score is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return score
+
+    def put(self, key, score):
+        self.results[key] = score
+
+    def save(self):
+        if not self.path:
+            return
+        results = [[list(c1), list(c2), color, depth, score] for (c1, c2, color, depth), score in self.results.items()]
+        with open(self.path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'settings': self.settings, 'results': results}, f)
+
+    def report(self):
+        probes = self.hits + self.misses
+        return "match cache: {} results, hits {}, misses {}, hit rate {:.1%}".format(
+            len(self.results), self.hits, self.misses, self.hits / probes if probes else 0.0)
+
+    def __len__(self):
+        return len(self.results)
+
+
+# --------------------------------------schedules-----------------------------------------
+def round_robin_pairs(n):
+    """
+    全循环赛，每两个染色体执黑、执白各比赛一场
+    :return pairs: [(i, j), ...]，i执黑
+    """
+    return [(i, j) for i in range(n) for j in range(n) if i != j]
+
+
+def random_pairs(n, k, rng=random):
+    """
+    每个染色体随机选k个对手，执黑、执白各比赛一场。两个染色体互相选中时只比赛一次
+    :return pairs: [(i, j), ...]，i执黑
+    """
+    opponents = set()
+    for i in range(n):
+        for j in rng.sample([j for j in range(n) if j != i], min(k, n - 1)):
+            opponents.add((min(i, j), max(i, j)))
+    pairs = []
+    for i, j in sorted(opponents):
+        pairs += [(i, j), (j, i)]
+    return pairs
+
+
+def swiss_pairs(scores, played, rng=random):
+    """
+    瑞士制的一轮：按当前得分从高到低排序，依次与得分最接近、还没有比赛过的对手配对。人数为奇数时得分最低的轮空
+    :param scores: 每个染色体当前的得分
+    :param played: 已经比赛过的(i, j)，i < j
+    :return pairs: [(i, j), ...]，每一对执黑、执白各比赛一场，i执黑
+    """
+    unpaired = sorted(range(len(scores)), key=lambda i: (-scores[i], rng.random()))
+    pairs = []
+    while len(unpaired) >= 2:
+        i = unpaired.pop(0)
+        k = next((k for k, j in enumerate(unpaired) if (min(i, j), max(i, j)) not in played), 0)
+        j = unpaired.pop(k)
+        played.add((min(i, j), max(i, j)))
+        pairs += [(i, j), (j, i)]
+    return pairs
+
+
+def kendall_tau(x, y):
+    """
+    两组得分排名的一致程度(Kendall tau-b，考虑了并列)，1表示完全一致，-1表示完全相反
+    """
+    concordant = discordant = ties_x = ties_y = 0
+    n = len(x)
+    for i in range(n):
+        for j in range(i + 1, n):
+            dx = x[i] - x[j]
+            dy = y[i] - y[j]
+            if dx == 0 and dy == 0:
+                continue
+            if dx == 0:
+                ties_x += 1
+            elif dy == 0:
+                ties_y += 1
+            elif (dx > 0) == (dy > 0):
+                concordant += 1
+            else:
+                discordant += 1
+    denominator = ((concordant + discordant + ties_x) * (concordant + discordant + ties_y)) ** 0.5
+    return (concordant - discordant) / denominator if denominator else 0.0
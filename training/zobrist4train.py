@@ -0,0 +1,145 @@
+"""
+AIV2搜索用的Zobrist哈希和置换表。
+棋盘(含边框)为8*8，第r行第c列的编号为r * 8 + c。
+局面的哈希值 = 所有棋子的键异或，再异或上执棋方和奇偶性的键。落子和回溯时只需异或落子位置和被反转的棋子。
+"""
+import random
+import numpy as np
+from const import *
+
+# --------------------------------------global-----------------------------------------
+_rng = random.Random(20190601)  # 固定种子，每次运行的哈希值相同
+ZOBRIST_BLACK = [_rng.getrandbits(64) for _ in range(64)]
+ZOBRIST_WHITE = [_rng.getrandbits(64) for _ in range(64)]
+ZOBRIST_FLIP = [b ^ w for b, w in zip(ZOBRIST_BLACK, ZOBRIST_WHITE)]  # 棋子由黑变白或由白变黑
+ZOBRIST_SIDE = _rng.getrandbits(64)  # 黑方执棋
+ZOBRIST_PARITY = _rng.getrandbits(64)  # 奇偶性为奇数
+
+EXACT = 0  # 精确值
+LOWER = 1  # 下界，发生了剪枝
+UPPER = 2  # 上界，没有一步超过alpha
+
+NO_MOVE = -1
+
+
+def board_hash(board):
+    """
+    从头计算棋盘的哈希值(不含执棋方和奇偶性)
+    :param board: Board.board
+    """
+    h = 0
+    for r, c in np.argwhere(board == BLACK):
+        h ^= ZOBRIST_BLACK[r * 8 + c]
+    for r, c in np.argwhere(board == WHITE):
+        h ^= ZOBRIST_WHITE[r * 8 + c]
+    return h
+
+
+def move_hash(h, pos, flipped, chessman_color):
+    """
+    落子之后的哈希值
+    :param h: 落子之前的哈希值
+    :param pos: 落子位置
+    :param flipped: Board.covert_color返回的被反转的棋子
+    :param chessman_color: 执棋者棋子颜色
+    """
+    h ^= (ZOBRIST_BLACK if chessman_color else ZOBRIST_WHITE)[pos[0] * 8 + pos[1]]
+    for p in flipped:
+        h ^= ZOBRIST_FLIP[p[0] * 8 + p[1]]
+    return h
+
+
+def position_key(h, chessman_color, parity):
+    """
+    加上执棋方和奇偶性之后的哈希值，作为置换表的键
+    """
+    if chessman_color:
+        h ^= ZOBRIST_SIDE
+    if parity % 2:
+        h ^= ZOBRIST_PARITY
+    return h
+
+
+class TranspositionTable:
+    """
+    固定大小的置换表，两层替换策略：
+    每个桶有两个槽，第一个槽保存深度最大的结果(深度优先)，第二个槽总是被覆盖。
+    上一次搜索(generation不同)留下的结果在第一个槽中也可以被覆盖，避免旧的深层结果一直占着位置。
+    """
+    ENTRY_BYTES = 8 + 8 + 2 + 1 + 1 + 1  # key + score + depth + bound + move + generation
+
+    def __init__(self, size=1 << 16):
+        """
+        :param size: 最多保存的结果数，向下取整为2的幂。内存约为size * ENTRY_BYTES字节
+        """
+        buckets = 1
+        while buckets * 4 <= size:
+            buckets *= 2
+        self.mask = buckets - 1
+        self.keys = np.zeros((buckets, 2), dtype=np.uint64)
+        self.scores = np.zeros((buckets, 2), dtype=np.float64)
+        self.depths = np.full((buckets, 2), -1, dtype=np.int16)  # -1表示空
+        self.bounds = np.zeros((buckets, 2), dtype=np.int8)
+        self.moves = np.full((buckets, 2), NO_MOVE, dtype=np.int8)
+        self.generations = np.zeros((buckets, 2), dtype=np.uint8)
+        self.generation = 0
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    # --------------------------------------public-----------------------------------------
+    def new_search(self):
+        """
+        每次从根结点开始搜索之前调用
+        """
+        self.generation = (self.generation + 1) & 0xff
+
+    def clear(self):
+        self.depths.fill(-1)
+        self.moves.fill(NO_MOVE)
+        self.probes = self.hits = self.stores = 0
+
+    def probe(self, key):
+        """
+        :return (score, bound, depth, move) or None: move为r * 8 + c，NO_MOVE表示没有
+        """
+        self.probes += 1
+        i = key & self.mask
+        for slot in (0, 1):
+            if self.depths[i, slot] >= 0 and self.keys[i, slot] == key:
+                self.hits += 1
+                return (float(self.scores[i, slot]), int(self.bounds[i, slot]), int(self.depths[i, slot]),
+                        int(self.moves[i, slot]))
+        return None
+
+    def store(self, key, score, bound, depth, move):
+        self.stores += 1
+        i = key & self.mask
+        if self.depths[i, 0] < 0 or self.keys[i, 0] == key or depth >= self.depths[i, 0] \
+                or self.generations[i, 0] != self.generation:
+            slot = 0
+        else:
+            slot = 1
+        self.keys[i, slot] = key
+        self.scores[i, slot] = score
+        self.bounds[i, slot] = bound
+        self.depths[i, slot] = depth
+        self.moves[i, slot] = move
+        self.generations[i, slot] = self.generation
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    @property
+    def nbytes(self):
+        """
+        表占用的内存(字节)
+        """
+        return (self.keys.nbytes + self.scores.nbytes + self.depths.nbytes + self.bounds.nbytes +
+                self.moves.nbytes + self.generations.nbytes)
+
+    def report(self):
+        return "tt: {} entries, {:.1f} KB, probes {}, hit rate {:.1%}, stores {}".format(
+            self.keys.size, self.nbytes / 1024, self.probes, self.hit_rate, self.stores)